@@ -0,0 +1,417 @@
+# cache.py
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+import xxhash
+
+from app.config import (
+    CACHE_TTL, CACHE_WRITE_BATCH_SIZE, SNAPSHOT_RETENTION, SUBNET_NETUIDS,
+    L1_CACHE_ENABLED, L1_CACHE_SIZE, L1_CACHE_TTL,
+    get_dividend_cache_key, get_hotkey_index_cache_key, get_block_hash_cache_key,
+    get_snapshot_history_key, get_snapshot_channel
+)
+
+logger = logging.getLogger(__name__)
+
+# Rows this process last published per subnet: netuid -> (fingerprint, {hotkey: encoded value})
+_published_subnets: Dict[int, Tuple[str, Dict[str, str]]] = {}
+
+
+class L1Cache:
+    """Bounded in-process LRU cache with a per-entry TTL.
+
+    Lookups never leave the process. Subnet hashes are content-addressed, so
+    entries keyed by fingerprint can't go stale; only the snapshot pointer can,
+    and the whole cache is cleared whenever the worker announces a new snapshot.
+    """
+
+    def __init__(self, maxsize: int = L1_CACHE_SIZE, ttl: float = L1_CACHE_TTL,
+                 enabled: bool = L1_CACHE_ENABLED, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.enabled = enabled
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= self.clock():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store `value`; `ttl` overrides the cache-wide TTL for this entry."""
+        if not self.enabled:
+            return
+        self._entries[key] = (self.clock() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else None,
+        }
+
+
+l1_cache = L1Cache()
+
+
+async def watch_snapshot_updates(client, cache: L1Cache = l1_cache, retry_delay: float = 1.0):
+    """Clear `cache` every time the worker publishes a snapshot. Runs until cancelled."""
+    while True:
+        pubsub = client.pubsub()
+        try:
+            await pubsub.subscribe(get_snapshot_channel())
+            # Anything published while we weren't subscribed is missed, so start clean
+            cache.clear()
+            logger.info("Listening for snapshot updates to invalidate the L1 cache")
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    cache.clear()
+                    logger.info(f"Cleared L1 cache for new snapshot {message['data'].decode('utf-8')}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Snapshot update listener failed, resubscribing: {e}")
+            await asyncio.sleep(retry_delay)
+        finally:
+            await pubsub.aclose()
+
+
+def fingerprint_rows(rows: Dict[str, str]) -> str:
+    """Order-independent xxh3 fingerprint of a subnet's encoded (hotkey, value) rows."""
+    digest = xxhash.xxh3_64()
+    for hotkey in sorted(rows):
+        digest.update(f"{hotkey}={rows[hotkey]}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class _BatchedPipeline:
+    """Non-transactional pipeline flushed every `batch_size` queued hash fields."""
+
+    def __init__(self, client, batch_size: int):
+        self.pipe = client.pipeline(transaction=False)
+        self.batch_size = batch_size
+        self.pending = 0
+
+    def hset(self, key: str, fields: Dict[str, str]):
+        items = list(fields.items())
+        for i in range(0, len(items), self.batch_size):
+            chunk = dict(items[i:i + self.batch_size])
+            self.pipe.hset(key, mapping=chunk)
+            self._queued(len(chunk))
+
+    def hdel(self, key: str, fields: List[str]):
+        for i in range(0, len(fields), self.batch_size):
+            chunk = fields[i:i + self.batch_size]
+            self.pipe.hdel(key, *chunk)
+            self._queued(len(chunk))
+
+    def _queued(self, count: int):
+        self.pending += count
+        if self.pending >= self.batch_size:
+            self.execute()
+
+    def execute(self):
+        self.pipe.execute()
+        self.pending = 0
+
+
+def _previous_rows(client, netuid: int, fingerprint: str) -> Dict[str, str]:
+    """Rows of a previously published subnet, from process memory or Redis."""
+    published = _published_subnets.get(netuid)
+    if published and published[0] == fingerprint:
+        return published[1]
+    values = client.hgetall(get_dividend_cache_key(netuid, fingerprint))
+    return {hotkey.decode("utf-8"): value.decode("utf-8") for hotkey, value in values.items()}
+
+
+def _hotkey_entry(dividends: Dict[int, Any]) -> str:
+    return json.dumps({"dividends": dividends, "total": sum(dividends.values())})
+
+
+def publish_snapshot(
+    client,
+    block_hash: str,
+    rows: Iterable[Tuple[int, str, Any]],
+    ttl: int = CACHE_TTL,
+    batch_size: int = CACHE_WRITE_BATCH_SIZE,
+) -> Dict[str, int]:
+    """Write a block snapshot incrementally, then atomically point readers at it.
+
+    Subnet hashes and the hotkey reverse index are addressed by a content
+    fingerprint, so subnets that haven't changed since the previous snapshot
+    are shared with it and only get their TTL extended. A changed subnet is
+    copied server-side from its previous version and patched with just the
+    rows that changed; one whose previous version is no longer in Redis is
+    written in full instead. Once everything is in place the pointer is
+    flipped to the new manifest, so readers always see a single consistent block.
+    Content no longer referenced by the last SNAPSHOT_RETENTION snapshots is
+    deleted in one UNLINK.
+
+    Returns counts of subnets and rows skipped, written or deleted.
+    """
+    start = time.perf_counter()
+
+    by_netuid: Dict[int, Dict[str, str]] = defaultdict(dict)
+    by_hotkey: Dict[str, Dict[int, Any]] = defaultdict(dict)
+    for netuid, hotkey, value in rows:
+        by_netuid[netuid][hotkey] = json.dumps(value)
+        by_hotkey[hotkey][netuid] = value
+    fingerprints = {netuid: fingerprint_rows(fields) for netuid, fields in by_netuid.items()}
+
+    raw_previous = client.get(get_block_hash_cache_key())
+    previous = _load_manifest(raw_previous) if raw_previous else None
+    previous_subnets = previous["subnets"] if previous else {}
+
+    stats = {
+        "rows": sum(len(fields) for fields in by_netuid.values()),
+        "subnets_written": 0, "subnets_skipped": 0, "subnets_deleted": 0,
+        "rows_written": 0, "rows_skipped": 0, "rows_deleted": 0,
+    }
+    touched_hotkeys: Set[str] = set()
+    # The reverse index can only be patched if we know every row the previous snapshot held
+    index_patchable = previous is not None
+
+    # First round trip: extend unchanged subnets and copy changed ones from their previous
+    # version. Either returns 0 if that key was evicted, and the subnet is then written in full.
+    index_fingerprint = xxhash.xxh3_64(json.dumps(sorted(fingerprints.items())).encode("utf-8")).hexdigest()
+    index_key = get_hotkey_index_cache_key(index_fingerprint)
+    seed = client.pipeline(transaction=False)
+    previous_rows: Dict[int, Dict[str, str]] = {}
+    for netuid in by_netuid:
+        cache_key = get_dividend_cache_key(netuid, fingerprints[netuid])
+        previous_fingerprint = previous_subnets.get(netuid)
+        if previous_fingerprint == fingerprints[netuid]:
+            seed.expire(cache_key, ttl * 2)
+        elif previous_fingerprint:
+            previous_rows[netuid] = _previous_rows(client, netuid, previous_fingerprint)
+            index_patchable = index_patchable and bool(previous_rows[netuid])
+            seed.copy(get_dividend_cache_key(netuid, previous_fingerprint), cache_key, replace=True)
+    if previous and previous["hotkeys"] == index_fingerprint:
+        seed.expire(index_key, ttl * 2)
+    elif previous:
+        seed.copy(get_hotkey_index_cache_key(previous["hotkeys"]), index_key, replace=True)
+    seeded = iter(seed.execute())
+
+    batch = _BatchedPipeline(client, batch_size)
+    for netuid, fields in by_netuid.items():
+        fingerprint = fingerprints[netuid]
+        cache_key = get_dividend_cache_key(netuid, fingerprint)
+        previous_fingerprint = previous_subnets.get(netuid)
+        present = bool(next(seeded)) if previous_fingerprint else False
+
+        if previous_fingerprint == fingerprint and present:
+            stats["subnets_skipped"] += 1
+            stats["rows_skipped"] += len(fields)
+            continue
+        # Rows of the previous snapshot, which the reverse index diff is taken against
+        old_rows = fields if previous_fingerprint == fingerprint else previous_rows.get(netuid, {})
+        changed = {hotkey: value for hotkey, value in fields.items() if old_rows.get(hotkey) != value}
+        removed = [hotkey for hotkey in old_rows if hotkey not in fields]
+        touched_hotkeys.update(changed)
+        touched_hotkeys.update(removed)
+        if present:
+            batch.hset(cache_key, changed)
+            batch.hdel(cache_key, removed)
+            stats["rows_written"] += len(changed)
+            stats["rows_deleted"] += len(removed)
+            stats["rows_skipped"] += len(fields) - len(changed)
+        else:
+            if previous_fingerprint:
+                logger.warning(f"Previous snapshot of subnet {netuid} is gone from Redis, writing it in full")
+            batch.hset(cache_key, fields)
+            stats["rows_written"] += len(fields)
+        stats["subnets_written"] += 1
+        # Snapshot data outlives its pointer, so a live pointer never references expired data
+        batch.pipe.expire(cache_key, ttl * 2)
+
+    for netuid, previous_fingerprint in previous_subnets.items():
+        if netuid not in by_netuid:
+            old_rows = _previous_rows(client, netuid, previous_fingerprint)
+            index_patchable = index_patchable and bool(old_rows)
+            touched_hotkeys.update(old_rows)
+            stats["subnets_deleted"] += 1
+            stats["rows_deleted"] += len(old_rows)
+
+    index_seeded = bool(next(seeded)) if previous else False
+    if index_seeded and index_patchable:
+        batch.hset(index_key, {hotkey: _hotkey_entry(by_hotkey[hotkey]) for hotkey in touched_hotkeys if hotkey in by_hotkey})
+        batch.hdel(index_key, [hotkey for hotkey in touched_hotkeys if hotkey not in by_hotkey])
+    else:
+        if previous:
+            logger.warning("Previous hotkey index can't be patched, writing it in full")
+            batch.pipe.delete(index_key)
+        batch.hset(index_key, {hotkey: _hotkey_entry(dividends) for hotkey, dividends in by_hotkey.items()})
+    batch.pipe.expire(index_key, ttl * 2)
+    batch.execute()
+
+    for netuid, fields in by_netuid.items():
+        _published_subnets[netuid] = (fingerprints[netuid], fields)
+
+    _flip_snapshot(client, {
+        "block_hash": block_hash,
+        "subnets": fingerprints,
+        "hotkeys": index_fingerprint,
+    }, ttl)
+
+    elapsed = time.perf_counter() - start
+    rate = stats["rows_written"] / elapsed if elapsed > 0 else 0.0
+    logger.info(
+        f"Published snapshot {block_hash} in {elapsed * 1000:.1f}ms - "
+        f"Subnets written/skipped/deleted: {stats['subnets_written']}/{stats['subnets_skipped']}/{stats['subnets_deleted']}, "
+        f"Rows written/skipped/deleted: {stats['rows_written']}/{stats['rows_skipped']}/{stats['rows_deleted']} "
+        f"({rate:.0f} rows/s, batch_size={batch_size})"
+    )
+    return stats
+
+
+def _flip_snapshot(client, manifest: Dict[str, Any], ttl: int):
+    """Point readers at `manifest` and bulk-delete content no retained snapshot references."""
+    encoded = json.dumps(manifest)
+    history_key = get_snapshot_history_key()
+    pipe = client.pipeline(transaction=True)
+    pipe.set(get_block_hash_cache_key(), encoded, ex=ttl)
+    pipe.lpush(history_key, encoded)
+    pipe.lrange(history_key, 0, -1)
+    pipe.ltrim(history_key, 0, SNAPSHOT_RETENTION - 1)
+    pipe.publish(get_snapshot_channel(), manifest["block_hash"])
+    _, _, history, _, _ = pipe.execute()
+
+    manifests = [_load_manifest(raw) for raw in history]
+    retained = {key for m in manifests[:SNAPSHOT_RETENTION] if m for key in _snapshot_keys(m)}
+    stale = {key for m in manifests[SNAPSHOT_RETENTION:] if m for key in _snapshot_keys(m)} - retained
+    if stale:
+        client.unlink(*stale)
+        logger.info(f"Garbage collected {len(stale)} unreferenced snapshot keys")
+
+
+def _load_manifest(raw) -> Optional[Dict[str, Any]]:
+    try:
+        manifest = json.loads(raw)
+        return {
+            "block_hash": manifest["block_hash"],
+            "subnets": {int(netuid): fingerprint for netuid, fingerprint in manifest["subnets"].items()},
+            "hotkeys": manifest["hotkeys"],
+        }
+    except (ValueError, TypeError, KeyError):
+        return None
+
+
+def _snapshot_keys(snapshot: Dict[str, Any]) -> List[str]:
+    """Every key referenced by one snapshot."""
+    keys = [get_dividend_cache_key(netuid, fingerprint) for netuid, fingerprint in snapshot["subnets"].items()]
+    keys.append(get_hotkey_index_cache_key(snapshot["hotkeys"]))
+    return keys
+
+
+# Readers take an asyncio Redis client so the API never blocks its event loop.
+# The manifest and single-pair/per-subnet reads are served from the L1 cache when enabled.
+
+async def get_current_snapshot(client) -> Optional[Dict[str, Any]]:
+    """Return the current snapshot manifest ({"block_hash", "subnets", "hotkeys"}), if one is published."""
+    snapshot = l1_cache.get("snapshot")
+    if snapshot is not None:
+        return snapshot
+    raw = await client.get(get_block_hash_cache_key())
+    snapshot = _load_manifest(raw) if raw else None
+    if snapshot is not None:
+        l1_cache.set("snapshot", snapshot)
+    return snapshot
+
+
+async def read_dividend(client, snapshot: Dict[str, Any], netuid: int, hotkey: str) -> Optional[Any]:
+    """Read one dividend with a single HGET."""
+    fingerprint = snapshot["subnets"].get(netuid)
+    if fingerprint is None:
+        return None
+    l1_key = ("dividend", netuid, fingerprint, hotkey)
+    value = l1_cache.get(l1_key)
+    if value is not None:
+        return value
+    value = await client.hget(get_dividend_cache_key(netuid, fingerprint), hotkey)
+    if value is None:
+        return None
+    value = json.loads(value)
+    l1_cache.set(l1_key, value)
+    return value
+
+
+async def read_subnet_dividends(client, snapshot: Dict[str, Any], netuid: int) -> Dict[str, Any]:
+    """Read every hotkey -> dividend of a subnet with a single HGETALL."""
+    fingerprint = snapshot["subnets"].get(netuid)
+    if fingerprint is None:
+        return {}
+    l1_key = ("subnet", netuid, fingerprint)
+    values = l1_cache.get(l1_key)
+    if values is not None:
+        return values
+    values = await client.hgetall(get_dividend_cache_key(netuid, fingerprint))
+    values = {hotkey.decode("utf-8"): json.loads(value) for hotkey, value in values.items()}
+    if values:
+        l1_cache.set(l1_key, values)
+    return values
+
+
+async def read_all_dividends(client, snapshot: Dict[str, Any],
+                             netuids: Iterable[int] = SUBNET_NETUIDS) -> List[Tuple[int, str, Any]]:
+    """Read (netuid, hotkey, value) rows for many subnets in one pipelined round trip."""
+    netuids = [netuid for netuid in netuids if netuid in snapshot["subnets"]]
+    pipe = client.pipeline(transaction=False)
+    for netuid in netuids:
+        pipe.hgetall(get_dividend_cache_key(netuid, snapshot["subnets"][netuid]))
+
+    rows = []
+    for netuid, values in zip(netuids, await pipe.execute()):
+        rows.extend((netuid, hotkey.decode("utf-8"), json.loads(value)) for hotkey, value in values.items())
+    return rows
+
+
+async def iter_snapshot_dividends(client, snapshot: Dict[str, Any], netuids: Iterable[int] = SUBNET_NETUIDS,
+                                  count: int = CACHE_WRITE_BATCH_SIZE) -> AsyncIterator[Tuple[int, str, Any]]:
+    """Yield (netuid, hotkey, value) rows subnet by subnet using HSCAN, holding one page at a time."""
+    for netuid in netuids:
+        fingerprint = snapshot["subnets"].get(netuid)
+        if fingerprint is None:
+            continue
+        async for hotkey, value in client.hscan_iter(get_dividend_cache_key(netuid, fingerprint), count=count):
+            yield netuid, hotkey.decode("utf-8"), json.loads(value)
+
+
+async def read_hotkey_dividends(client, snapshot: Dict[str, Any], hotkey: str) -> Optional[Dict[str, Any]]:
+    """Read a hotkey's per-subnet dividends and cross-subnet total with a single HGET.
+
+    Returns {"dividends": [(netuid, value), ...], "total": total} or None.
+    """
+    value = await client.hget(get_hotkey_index_cache_key(snapshot["hotkeys"]), hotkey)
+    if value is None:
+        return None
+    entry = json.loads(value)
+    return {
+        "dividends": sorted((int(netuid), dividend) for netuid, dividend in entry["dividends"].items()),
+        "total": entry["total"],
+    }
@@ -1,20 +1,15 @@
-from pathlib import Path
 from typing import List, Dict, Any
-import bittensor as bt
 from app.config import *
-# from bittensor_wallet import Wallet # type: ignore
-from bittensor import wallet as Wallet
-# from bittensor import AsyncSubtensor
 import os
 import logging
 import aiohttp
 import json
+import re
 import subprocess
-from bittensor.utils.balance import Balance
-from bittensor.utils.balance import tao
-from bittensor.core.async_subtensor import add_stake_extrinsic, unstake_extrinsic
-# from bittensor.core.subtensor import get_balance
-# from bittensor.utils
+import time
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from app.metrics import DATURA_LATENCY, LLM_LATENCY
 
 SENTIMENT_PROMPT = """Analyze the sentiment expressed in the following tweets and provide a single sentiment score ranging from -100 (very negative) to +100 (very positive), representing the overall sentiment of the provided tweets. Consider the nuances in language, opinions, and emotions expressed in the text.
 
@@ -24,28 +19,64 @@ SENTIMENT_PROMPT = """Analyze the sentiment expressed in the following tweets an
 Just retiunr the overall sentiment score without any explanatory text
 """
 
+TWEET_SENTIMENT_PROMPT = """Analyze the sentiment expressed in each of the following numbered tweets about Bittensor subnets. For every tweet, provide a sentiment score ranging from -100 (very negative) to +100 (very positive). Consider the nuances in language, opinions, and emotions expressed in the text.
+
+**Tweets:**
+{tweets}
+
+Respond with only a JSON object mapping each tweet number to its score, for example {{"1": 25, "2": -40}}, and no other text
+"""
+
 logger = logging.getLogger(__name__)
 
 class DaturaClient:
-    def __init__(self):
+    def __init__(self, max_workers: Optional[int] = None):
+        from datura_py import Datura # type: ignore
         self.client = Datura(api_key=DATURA_API_KEY)
+        # The SDK only has a blocking client, so searches run on a bounded pool off the event loop
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers if max_workers is not None else DATURA_MAX_WORKERS,
+            thread_name_prefix="datura-search"
+        )
 
-    async def search_tweets(self, netuid: str) -> dict[str, any]:
-        """Search for tweets using Datura API."""
+    def _search(self, netuid: str, count: int):
+        start = time.perf_counter()
+        outcome = "error"
         try:
             response = self.client.basic_twitter_search(
                 query=f"Bittensor netuid {netuid}",
                 sort="Top",
                 lang="en",
-                count=5
+                count=count
             )
-            return response
+            outcome = "success"
+        finally:
+            DATURA_LATENCY.labels(outcome).observe(time.perf_counter() - start)
+        logger.info(f"Datura search completed - Netuid: {netuid}, Latency: {(time.perf_counter() - start) * 1000:.0f}ms")
+        return response
+
+    async def search_tweets(self, netuid: str, count: int = DATURA_TWEET_COUNT) -> dict[str, any]:
+        """Search for tweets using Datura API."""
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, self._search, netuid, count)
         except Exception as e:
             logger.error(f"Error searching tweets: {str(e)}")
             raise
 
+    async def search_tweets_many(self, netuids: List[int], count: int = DATURA_TWEET_COUNT) -> Dict[int, Any]:
+        """Search tweets for many netuids concurrently. Failed searches map to an empty list."""
+        responses = await asyncio.gather(
+            *(self.search_tweets(str(netuid), count) for netuid in netuids),
+            return_exceptions=True
+        )
+        return {
+            netuid: [] if isinstance(response, Exception) else response
+            for netuid, response in zip(netuids, responses)
+        }
+
     async def close(self):
-        await self.client.aclose()
+        self.executor.shutdown(wait=False)
 
 
 class LLMClient:
@@ -53,17 +84,69 @@ class LLMClient:
         self.api_key = CHUTES_API_KEY
         self.model_name = model or "unsloth/Llama-3.2-3B-Instruct"
         self.temperature = 0.7
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Return the long-lived session, creating it on first use in the running event loop.
+
+        The session's pooled connections belong to the loop that opened it and
+        can only be closed there, so another loop gets a RuntimeError instead of
+        a replacement that would leak them. `close()` it on its own loop first.
+        """
+        loop = asyncio.get_running_loop()
+        if self._session is not None and not self._session.closed and self._session_loop is not loop:
+            raise RuntimeError("LLM HTTP session is bound to another event loop; close it there first")
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=LLM_POOL_SIZE,
+                keepalive_timeout=LLM_KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(
+                    total=None,
+                    sock_connect=LLM_CONNECT_TIMEOUT,
+                    sock_read=LLM_READ_TIMEOUT
+                ),
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json"
+                }
+            )
+            self._session_loop = loop
+            logger.info(f"LLM HTTP session opened - Pool size: {LLM_POOL_SIZE}")
+        return self._session
+
+    async def close(self):
+        """Close the pooled session and its connections."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("LLM HTTP session closed")
+        self._session = None
+        self._session_loop = None
 
     async def query_chute_llm(self, tweets: str) -> str:
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
         prompt = SENTIMENT_PROMPT.format(
             tweets=tweets
         )
+        return await self._complete(prompt)
 
+    async def score_tweets(self, tweets: List[str]) -> Dict[int, float]:
+        """Score many tweets, one score each, with one completion.
+
+        Returns index -> score for every tweet the response scored validly.
+        Tweets that are missing or out of range are left out, so the caller
+        can score them on their own. Raises ValueError if the response isn't
+        a JSON object.
+        """
+        numbered = "\n".join(f"{number}. {' '.join(tweet.split())}" for number, tweet in enumerate(tweets, start=1))
+        content = await self._complete(TWEET_SENTIMENT_PROMPT.format(tweets=numbered))
+        scores = parse_batch_scores(content, range(1, len(tweets) + 1))
+        return {number - 1: score for number, score in scores.items()}
+
+    async def _complete(self, prompt: str) -> str:
         body = {
             "model": self.model_name,
             "messages": [
@@ -74,206 +157,138 @@ class LLMClient:
             "temperature": self.temperature
         }
 
-
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                "https://llm.chutes.ai/v1/chat/completions",
-                headers=headers,
-                json=body
-            ) as response:
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            async with self._get_session().post(CHUTES_API_URL, json=body) as response:
                 if response.status != 200:
                     error_msg = await response.text()
+                    logger.warning(f"LLM call failed - Status: {response.status}, Latency: {(time.perf_counter() - start) * 1000:.0f}ms")
                     raise Exception(f"Failed to call Chutes API ({response.status}): {error_msg}")
                 
                 data = await response.json()
-                return data["choices"][0]["message"]["content"]
-
-
-class BittensorWallet:
-    def __init__(self, wallet_path: Optional[str] = None):
-        self.wallet_path = wallet_path or "~/.bittensor/wallets/"
-        self.wallet_name = BITTENSOR_WALLET_NAME
-        self.hotkey = BITTENSOR_WALLET_HOTKEY
-        self.mnemonic = BITTENSOR_MNEMONIC
-        
-        # Faucet info
-        self.faucet_mnemonic = "diamond like interest affair safe clarify lawsuit innocent beef van grief color"
-        self.faucet_wallet_name = "faucet"
-        self.faucet_hotkey = "default"
-        self.max_faucet_transfer = 40.0
-
-        # Create wallet directory if it doesn't exist
-        Path(self.wallet_path).mkdir(parents=True, exist_ok=True)
-        
-        # Initialize wallet and subtensor
-        self.wallet = self._initialize_wallet()
-        self.subtensor = self._initialize_subtensor()
-        
-    def _initialize_wallet(self) -> Wallet:
-        """Initialize or create wallet."""
-        try:
-            w = Wallet(
-                name=self.wallet_name,
-                hotkey=self.hotkey,
-                path=self.wallet_path
-            )
-            
-            w.regenerate_coldkey(
-                mnemonic=self.mnemonic,
-                use_password=False,
-                overwrite=True,
-                suppress=True,
-            )
+            outcome = "success"
+        finally:
+            LLM_LATENCY.labels(outcome).observe(time.perf_counter() - start)
+        logger.info(f"LLM call completed - Model: {self.model_name}, Latency: {(time.perf_counter() - start) * 1000:.0f}ms")
+        return data["choices"][0]["message"]["content"]
 
-            w.regenerate_hotkey(
-                mnemonic=self.mnemonic,
-                use_password=False,
-                overwrite=True,
-                suppress=True,
-            )
 
-            # Try accessing keys to validate wallet
-            try:
-                _ = w.coldkeypub.ss58_address
-                _ = w.hotkey.ss58_address
-                logger.info(f"Wallet initialized - Name: {self.wallet_name}, Coldkey: {w.coldkeypub.ss58_address}, Hotkey: {w.hotkey.ss58_address}")
-            except Exception:
-                # Keys are missing — create new wallet
-                logger.info(f"Creating new wallet - Name: {self.wallet_name}")
-                w.create()
-                self.hotkey = w.hotkey.ss58_address
-                logger.info(f"New wallet created - Coldkey: {w.coldkeypub.ss58_address}, Hotkey: {w.hotkey.ss58_address}")
-
-            return w
+def parse_batch_scores(content: str, keys) -> Dict[int, float]:
+    """Parse a {"key": score} JSON object out of an LLM response, keeping valid scores only."""
+    match = re.search(r"\{.*\}", content, re.DOTALL)
+    if not match:
+        raise ValueError(f"No JSON object in LLM response: {content[:200]}")
+    data = json.loads(match.group(0))
+    if not isinstance(data, dict):
+        raise ValueError("LLM response is not a JSON object")
 
-        except Exception as e:
-            logger.error(f"Wallet initialization failed - Error: {str(e)}")
-            raise
-            
-    def _initialize_subtensor(self) -> bt.subtensor:
-        """Initialize subtensor connection."""
+    scores = {}
+    for key in keys:
+        value = data.get(str(key))
         try:
-            # Initialize subtensor with testnet
-            subtensor = bt.subtensor(network="test")
-            logger.info("Connected to Bittensor testnet successfully")
-            return subtensor
-        except Exception as e:
-            logger.error(f"Failed to connect to Bittensor testnet - Error: {str(e)}")
-            raise
+            score = float(value)
+        except (TypeError, ValueError):
+            continue
+        if -100 <= score <= 100:
+            scores[key] = score
+    return scores
 
-    async def _fund_if_needed(self):
-        """Fund the wallet from the faucet if balance is low."""
-        try:
-            current_balance = await self.get_tao_balance()
-            if current_balance is not None and current_balance < 1.0:
-                logger.info(f"Wallet balance low ({current_balance:.4f} TAO) - Attempting faucet funding")
-
-                faucet_wallet = Wallet(
-                    name=self.faucet_wallet_name,
-                    hotkey=self.faucet_hotkey,
-                    path=self.wallet_path
-                )
-
-                faucet_wallet.regenerate_coldkey(self.faucet_mnemonic, use_password=False, overwrite=True, suppress=True)
-                faucet_wallet.regenerate_hotkey(self.faucet_mnemonic, use_password=False, overwrite=True, suppress=True)
-
-                faucet_balance = self.subtensor.get_balance(faucet_wallet.coldkeypub.ss58_address)
-                if faucet_balance.tao < self.max_faucet_transfer:
-                    logger.warning(f"Faucet wallet has insufficient funds ({faucet_balance.tao:.4f} TAO)")
-                    return
-
-                result = self.subtensor.transfer(
-                    wallet=faucet_wallet,
-                    dest=self.wallet.coldkeypub.ss58_address,
-                    amount=self.max_faucet_transfer,
-                    wait_for_inclusion=True
-                )
-
-                logger.info(f"Faucet funding successful - Amount: {self.max_faucet_transfer:.4f} TAO")
-            else:
-                logger.info(f"Wallet has sufficient balance: {current_balance:.4f} TAO")
 
-        except Exception as e:
-            logger.error(f"Faucet funding failed - Error: {str(e)}")
-            raise
+class SubstratePool:
+    """Process-wide pool of warm AsyncSubstrateInterface connections."""
+
+    def __init__(self, url: Optional[str] = None, size: Optional[int] = None,
+                 health_check_interval: Optional[float] = None):
+        self.url = url or SUBSTRATE_URL
+        self.size = size if size is not None else SUBSTRATE_POOL_SIZE
+        self.health_check_interval = (
+            health_check_interval if health_check_interval is not None else SUBSTRATE_HEALTH_CHECK_INTERVAL
+        )
+        self._idle: Optional[asyncio.Queue] = None
+        self._last_checked: Dict[int, float] = {}
 
-    def get_wallet_info(self) -> dict:
-        """Get current balance of wallet."""
+    def _ensure_queue(self) -> asyncio.Queue:
+        if self._idle is None:
+            # Empty slots are connected on first use
+            self._idle = asyncio.Queue()
+            for _ in range(self.size):
+                self._idle.put_nowait(None)
+        return self._idle
+
+    async def _connect(self) -> AsyncSubstrateInterface:
+        substrate = AsyncSubstrateInterface(self.url, ss58_format=SS58_FORMAT)
+        await substrate.initialize()
+        self._last_checked[id(substrate)] = time.monotonic()
+        logger.info(f"Substrate connection opened - URL: {self.url}")
+        return substrate
+
+    async def _discard(self, substrate: AsyncSubstrateInterface):
+        self._last_checked.pop(id(substrate), None)
         try:
-            balance = asyncio.run(self.get_tao_balance())
-            return {
-                "wallet_name": self.wallet_name,
-                "hotkey": self.hotkey,
-                "tao_balance": balance or 0.0
-            }
+            await substrate.close()
         except Exception as e:
-            logger.error(f"Error getting wallet info: {str(e)}")
-            return {
-                "wallet_name": self.wallet_name,
-                "hotkey": self.hotkey,
-                "tao_balance": 0.0
-            }
-
-    async def add_stake(self, netuid: int, hotkey: str, amount: float) -> Dict[str, Any]:
-        """Add stake to a hotkey."""
+            logger.warning(f"Error closing substrate connection - Error: {str(e)}")
+
+    async def _ensure_healthy(self, substrate: Optional[AsyncSubstrateInterface]) -> AsyncSubstrateInterface:
+        if substrate is None:
+            return await self._connect()
+        if time.monotonic() - self._last_checked.get(id(substrate), 0.0) < self.health_check_interval:
+            return substrate
         try:
-            amount_balance = Balance.from_tao(amount).set_unit(netuid)
-            logger.info(f"Preparing stake - Netuid: {netuid}, Hotkey: {hotkey}, Amount: {amount_balance.tao:.4f} TAO")
-            
-            await self._fund_if_needed()
-
-            result = await self.subtensor.add_stake(
-                wallet=self.wallet,
-                netuid=netuid,
-                hotkey_ss58=hotkey,
-                amount=amount_balance.tao,
-                allow_partial_stake=True,
-                safe_staking=True
-            )
-            
-            logger.info(f"Stake successful - Netuid: {netuid}, Hotkey: {hotkey}, Amount: {amount_balance.tao:.4f} TAO")
-            return {
-                "success": True,
-                "result": result
-            }
+            await substrate.get_chain_head()
+            self._last_checked[id(substrate)] = time.monotonic()
+            return substrate
         except Exception as e:
-            logger.error(f"Stake failed - Netuid: {netuid}, Hotkey: {hotkey}, Error: {str(e)}")
-            return {"success": False, "error": str(e)}
-            
-    async def unstake(self, netuid: int, hotkey: str, amount: float) -> Dict[str, Any]:
-        """Remove stake from a hotkey."""
+            logger.warning(f"Substrate health check failed, reconnecting - Error: {str(e)}")
+            await self._discard(substrate)
+            return await self._connect()
+
+    async def start(self):
+        """Open every connection up front so the first requests don't pay for it."""
+        idle = self._ensure_queue()
+        warmed = []
+        while not idle.empty():
+            substrate = idle.get_nowait()
+            try:
+                substrate = await self._ensure_healthy(substrate)
+            except Exception as e:
+                logger.error(f"Failed to warm substrate connection - Error: {str(e)}")
+                substrate = None
+            warmed.append(substrate)
+        for substrate in warmed:
+            idle.put_nowait(substrate)
+        logger.info(f"Substrate pool started - Size: {self.size}, Connected: {sum(s is not None for s in warmed)}")
+
+    async def close(self):
+        """Close every idle connection."""
+        if self._idle is None:
+            return
+        while not self._idle.empty():
+            substrate = self._idle.get_nowait()
+            if substrate is not None:
+                await self._discard(substrate)
+        self._idle = None
+        logger.info("Substrate pool closed")
+
+    @asynccontextmanager
+    async def connection(self):
+        """Borrow a healthy connection, reconnecting it if it has gone stale."""
+        idle = self._ensure_queue()
+        substrate = await idle.get()
         try:
-            amount_balance = Balance.from_tao(amount).set_unit(netuid)
-            logger.info(f"Preparing unstake - Netuid: {netuid}, Hotkey: {hotkey}, Amount: {amount_balance.tao:.4f} TAO")
-
-            result = await self.subtensor.unstake(
-                wallet=self.wallet,
-                netuid=netuid,
-                hotkey_ss58=hotkey,
-                amount=amount_balance.tao,
-                allow_partial_stake=True,
-                safe_staking=True
-            )
-            
-            logger.info(f"Unstake successful - Netuid: {netuid}, Hotkey: {hotkey}, Amount: {amount_balance.tao:.4f} TAO")
-            return {
-                "success": True,
-                "result": result
-            }
-        except Exception as e:
-            logger.error(f"Unstake failed - Netuid: {netuid}, Hotkey: {hotkey}, Error: {str(e)}")
-            return {"success": False, "error": str(e)}
-            
-    async def get_tao_balance(self) -> Optional[float]:
-        """Get TAO balance from subtensor."""
+            substrate = await self._ensure_healthy(substrate)
+        except Exception:
+            idle.put_nowait(None)
+            raise
         try:
-            balance = self.subtensor.get_balance(self.wallet.coldkeypub.ss58_address)
-            if balance is not None:
-                logger.info(f"Current wallet balance: {balance.tao:.4f} TAO")
-                return balance.tao
-            else:
-                logger.warning("No balance found for wallet")
-                return 0.0
-        except Exception as e:
-            logger.error(f"Failed to get wallet balance - Error: {str(e)}")
-            return None
+            yield substrate
+        except Exception:
+            # Force a health check before the connection is handed out again
+            self._last_checked[id(substrate)] = 0.0
+            raise
+        finally:
+            idle.put_nowait(substrate)
+
+
+substrate_pool = SubstratePool()
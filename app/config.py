@@ -3,15 +3,13 @@ from fastapi.middleware.cors import CORSMiddleware
 import time
 import logging
 from async_substrate_interface.async_substrate import AsyncSubstrateInterface
-from bittensor.core.chain_data import decode_account_id
-from bittensor.core.settings import SS58_FORMAT
 from typing import List, Tuple
 import redis
+import redis.asyncio as aioredis
+from app.metrics import TimedRedis, TimedAsyncRedis
 from datetime import timedelta
 import json
-from app.utils import get_current_user
 from fastapi import Depends, HTTPException, status
-from app.utils import fake_users_db
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import jwt, JWTError # type: ignore
@@ -23,7 +21,6 @@ from passlib.context import CryptContext # type: ignore
 import os
 from dotenv import load_dotenv
 from datetime import datetime
-from datura_py import Datura # type: ignore
 
 load_dotenv()
 
@@ -31,24 +28,90 @@ load_dotenv()
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
 REDIS_DB = int(os.getenv("REDIS_DB", 0))
+REDIS_POOL_SIZE = int(os.getenv("REDIS_POOL_SIZE", 50))  # Max asyncio Redis connections held by the API process
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", 5))  # Seconds a request waits for a free pooled connection
 
 DATURA_API_KEY = os.getenv("DATURA_API_KEY")
 CHUTES_API_KEY = os.getenv("CHUTES_API_KEY")
+CHUTES_API_URL = os.getenv("CHUTES_API_URL", "https://llm.chutes.ai/v1/chat/completions")
+
+# Datura search settings
+DATURA_MAX_WORKERS = int(os.getenv("DATURA_MAX_WORKERS", 8))  # Concurrent searches; the SDK is blocking, so each uses a thread
+DATURA_TWEET_COUNT = int(os.getenv("DATURA_TWEET_COUNT", 5))  # Tweets fetched per netuid
+
+# LLM HTTP client settings
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", 20))  # Max open connections to the LLM API per process
+LLM_KEEPALIVE_TIMEOUT = float(os.getenv("LLM_KEEPALIVE_TIMEOUT", 60))  # Seconds an idle connection is kept open
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", 5))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", 60))
 
 BITTENSOR_WALLET_NAME = os.getenv("BITTENSOR_WALLET_NAME", "default")
 BITTENSOR_WALLET_HOTKEY = os.getenv("BITTENSOR_WALLET_HOTKEY", "default")
 BITTENSOR_MNEMONIC = os.getenv("BITTENSOR_MNEMONIC", None)
+STAKE_RATE_TOLERANCE = float(os.getenv("STAKE_RATE_TOLERANCE", 0.005))  # Max subnet price move a batched trade accepts, as with safe_staking
+
+# Auth settings
+USERS_DB_PATH = os.getenv("USERS_DB_PATH", "fake_users_db.json")
+AUTH_HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", 4))  # Threads verifying bcrypt hashes off the event loop
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))  # Verified bearer tokens kept per API process
 
 # Cache settings
 CACHE_TTL = 240  # 2 minutes in seconds
+CACHE_WRITE_BATCH_SIZE = int(os.getenv("CACHE_WRITE_BATCH_SIZE", 1000))  # Hash fields per pipeline flush
+SNAPSHOT_RETENTION = int(os.getenv("SNAPSHOT_RETENTION", 2))  # Snapshots kept for readers that loaded an older pointer
+
+# In-process L1 cache in front of Redis for hot dividend lookups (API only)
+L1_CACHE_ENABLED = os.getenv("L1_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+L1_CACHE_SIZE = int(os.getenv("L1_CACHE_SIZE", 10000))  # Max entries per API process
+L1_CACHE_TTL = float(os.getenv("L1_CACHE_TTL", 30))  # Seconds; bounds staleness if a publish notification is missed
+
+# Subnets covered by the dividend cache
+SUBNET_NETUIDS = range(1, 51)
+
+# Substrate settings
+SS58_FORMAT = 42  # Bittensor address format, as bittensor.core.settings.SS58_FORMAT
+SUBSTRATE_URL = os.getenv("SUBSTRATE_URL", "wss://entrypoint-finney.opentensor.ai:443")
+SUBSTRATE_POOL_SIZE = int(os.getenv("SUBSTRATE_POOL_SIZE", 2))  # Warm connections held by the API process
+SUBSTRATE_HEALTH_CHECK_INTERVAL = float(os.getenv("SUBSTRATE_HEALTH_CHECK_INTERVAL", 30))  # Seconds between liveness probes
+SUBSTRATE_FETCH_CONCURRENCY = int(os.getenv("SUBSTRATE_FETCH_CONCURRENCY", 10))  # Subnet query_maps in flight per connection
+BALANCE_CACHE_TTL = float(os.getenv("BALANCE_CACHE_TTL", 12))  # Seconds a wallet balance is reused, about one block
+
+# Sentiment refresh settings
+SENTIMENT_STALE_AFTER = float(os.getenv("SENTIMENT_STALE_AFTER", 120))  # Seconds before a cached score is refreshed
+SENTIMENT_REFRESH_INTERVAL = float(os.getenv("SENTIMENT_REFRESH_INTERVAL", 60))  # Seconds between scheduled refresh sweeps
+SENTIMENT_DEMAND_WINDOW = float(os.getenv("SENTIMENT_DEMAND_WINDOW", 900))  # Netuids requested this recently are kept fresh
+SENTIMENT_BATCH_SIZE = int(os.getenv("SENTIMENT_BATCH_SIZE", 50))  # Tweets scored per LLM request; 1 disables batching
+TWEET_SCORE_TTL = int(os.getenv("TWEET_SCORE_TTL", 7 * 24 * 3600))  # Seconds a tweet's own score is reused
+SENTIMENT_LLM_DEADLINE = float(os.getenv("SENTIMENT_LLM_DEADLINE", 10))  # Seconds to wait for the LLM before using lexicon scores
+LEXICON_SCORE_TTL = int(os.getenv("LEXICON_SCORE_TTL", 600))  # Lexicon fallback scores expire sooner so the LLM gets another try
+
+# Metrics settings
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", 9808))  # Celery worker exporter; 0 disables it
+
+# Trading settings
+TRADE_NET_WINDOW = float(os.getenv("TRADE_NET_WINDOW", 30))  # Seconds of trade intents netted into one submission
 
 # Cache key patterns
-def get_dividend_cache_key(netuid: int, hotkey: str) -> str:
-    return f"tao_dividend:{netuid}:{hotkey}"
+def get_dividend_cache_key(netuid: int, fingerprint: str) -> str:
+    """Hash of hotkey -> dividend for one subnet, addressed by its content fingerprint."""
+    return f"tao_dividend:subnet:{netuid}:{fingerprint}"
+
+def get_hotkey_index_cache_key(fingerprint: str) -> str:
+    """Hash of hotkey -> {netuid: dividend} and cross-subnet total, addressed by its content fingerprint."""
+    return f"tao_dividend:hotkeys:{fingerprint}"
 
 def get_block_hash_cache_key() -> str:
+    """Pointer to the manifest (block hash and content fingerprints) of the current snapshot."""
     return "tao_dividend:block_hash"
 
+def get_snapshot_history_key() -> str:
+    """List of published snapshot manifests, newest first."""
+    return "tao_dividend:snapshots"
+
+def get_snapshot_channel() -> str:
+    """Pub/sub channel announcing the block hash of each newly published snapshot."""
+    return "tao_dividend:snapshot_published"
+
 def get_update_status_key() -> str:
     return "tao_dividend:update_status"
 
@@ -58,6 +121,33 @@ def get_update_start_time_key() -> str:
 def get_update_progress_key() -> str:
     return "tao_dividend:update_progress" 
 
+def get_sentiment_lock_key(netuid: int) -> str:
+    """Held while an analysis for `netuid` is queued or running."""
+    return f"divident_sentiment:{netuid}:lock"
+
+def get_sentiment_demand_key() -> str:
+    """Sorted set of netuid -> last time the API served its sentiment."""
+    return "divident_sentiment:requested"
+
+def get_sentiment_refresh_stats_key() -> str:
+    """Hash of enqueued / suppressed sentiment refresh counters."""
+    return "divident_sentiment:refresh_stats"
+
+def get_tweet_sentiment_key(tweet_key: str) -> str:
+    """Score of a single tweet, keyed by its ID or content hash."""
+    return f"tweet_sentiment:{tweet_key}"
+
+def get_trade_intents_key() -> str:
+    """Hash of "{netuid}:{hotkey}" -> net TAO to stake (positive) or unstake (negative) since the last flush."""
+    return "tao_trade:intents"
+
+def get_trade_intent_counts_key() -> str:
+    """Hash of "{netuid}:{hotkey}" -> number of intents folded into the net amount."""
+    return "tao_trade:intent_counts"
+
+def get_trade_flush_stats_key() -> str:
+    return "tao_trade:last_flush"
+
 def get_sentiment_cache_key(netuid: int) -> str:
     return f"divident_sentiment:{netuid}"
 
@@ -69,14 +159,22 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-# Initialize Redis client
-try:
-    redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB)
-    redis_client.ping()  # Test connection
-    logger.info("Successfully connected to Redis")
-except redis.ConnectionError as e:
-    logger.error(f"Failed to connect to Redis: {e}")
-    raise
+# Initialize Redis client. Connections open on first use; the API lifespan
+# checks Redis on startup, so importing this module does no network I/O.
+# Both clients record per-command latency in tao_redis_command_seconds.
+redis_client = TimedRedis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB)
+
+# Asyncio Redis client for the API routes. Connections are opened lazily from a
+# bounded pool; the FastAPI lifespan checks it on startup and closes it on shutdown.
+async_redis_client = TimedAsyncRedis(
+    connection_pool=aioredis.BlockingConnectionPool(
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        db=REDIS_DB,
+        max_connections=REDIS_POOL_SIZE,
+        timeout=REDIS_POOL_TIMEOUT
+    )
+)
 
 router = APIRouter()
 app = FastAPI()
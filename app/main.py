@@ -1,9 +1,32 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi.openapi.utils import get_openapi
+from contextlib import asynccontextmanager
 from app.config import *
 from app.routes import *
+from app.clients import substrate_pool
+from app.cache import l1_cache, watch_snapshot_updates
+from app.metrics import collector_registry
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await async_redis_client.ping()
+    logger.info(f"Async Redis client ready (pool size {REDIS_POOL_SIZE})")
+    await substrate_pool.start()
+    # Drop L1 entries as soon as the worker publishes a new snapshot
+    l1_watcher = asyncio.create_task(watch_snapshot_updates(async_redis_client)) if l1_cache.enabled else None
+    yield
+    if l1_watcher:
+        l1_watcher.cancel()
+        try:
+            await l1_watcher
+        except asyncio.CancelledError:
+            pass
+    await substrate_pool.close()
+    await async_redis_client.aclose(close_connection_pool=True)
 
 # Initialize FastAPI app with metadata
 app = FastAPI(
@@ -12,7 +35,8 @@ app = FastAPI(
     version="1.0.0",
     docs_url=None,  # Disable default docs
     redoc_url=None,  # Disable default redoc
-    openapi_url="/api/v1/openapi.json"
+    openapi_url="/api/v1/openapi.json",
+    lifespan=lifespan
 )
 
 # CORS configuration
@@ -74,3 +98,8 @@ async def health_check():
 
 # Include routers
 app.include_router(router, prefix="/api/v1")
+
+# Prometheus scrape endpoint, at the conventional unversioned path
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(generate_latest(collector_registry()), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,126 @@
+from typing import Optional
+import os
+import logging
+import redis
+import redis.asyncio as aioredis
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, multiprocess, start_http_server
+)
+
+logger = logging.getLogger(__name__)
+
+# Remote calls: milliseconds for Redis and single substrate reads, up to a minute for the LLM
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+REMOTE_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+UPDATE_BUCKETS = (1.0, 2.5, 5.0, 10.0, 15.0, 30.0, 60.0, 120.0, 300.0)
+
+SUBSTRATE_LATENCY = Histogram(
+    "tao_substrate_request_seconds", "Latency of substrate storage reads",
+    ["method", "netuid"], buckets=REMOTE_BUCKETS
+)
+REDIS_LATENCY = Histogram(
+    "tao_redis_command_seconds", "Latency of Redis commands; pipelines are timed as one PIPELINE call",
+    ["command"], buckets=FAST_BUCKETS
+)
+DIVIDEND_CACHE_REQUESTS = Counter(
+    "tao_dividend_cache_requests_total", "get_dividend cache lookups by query condition (1, 2 or 3) and result",
+    ["condition", "result"]
+)
+SENTIMENT_FRESH_READS = Counter(
+    "tao_sentiment_fresh_reads_total", "get_dividend sentiment reads that were fresh, so no refresh was queued"
+)
+WALLET_BALANCE_LOOKUPS = Counter(
+    "tao_wallet_balance_lookups_total", "Wallet TAO balance lookups served from the per-block cache (hit) or the chain",
+    ["result"]
+)
+LLM_LATENCY = Histogram(
+    "tao_llm_request_seconds", "Latency of Chutes LLM completions",
+    ["outcome"], buckets=REMOTE_BUCKETS
+)
+DATURA_LATENCY = Histogram(
+    "tao_datura_search_seconds", "Latency of Datura tweet searches",
+    ["outcome"], buckets=REMOTE_BUCKETS
+)
+UPDATE_DURATION = Histogram(
+    "tao_dividend_update_seconds", "Duration of update_dividends_cache runs",
+    ["outcome"], buckets=UPDATE_BUCKETS
+)
+UPDATE_ROWS_WRITTEN = Counter(
+    "tao_dividend_update_rows_written_total", "Dividend rows written to Redis by update_dividends_cache"
+)
+UPDATE_ROWS = Gauge(
+    "tao_dividend_update_rows", "Rows in the most recently published dividend snapshot",
+    multiprocess_mode="mostrecent"
+)
+
+
+def netuid_label(netuid, valid_netuids) -> str:
+    """Label for a netuid; anything outside `valid_netuids` shares "other" so clients can't mint series."""
+    return str(netuid) if netuid in valid_netuids else "other"
+
+
+def multiprocess_enabled() -> bool:
+    return bool(os.environ.get("PROMETHEUS_MULTIPROCESS_DIR") or os.environ.get("prometheus_multiproc_dir"))
+
+
+def collector_registry() -> CollectorRegistry:
+    """Registry to expose: the merged per-process files in multiprocess mode, this process otherwise."""
+    if not multiprocess_enabled():
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def start_exporter(port: int) -> bool:
+    """Serve metrics over HTTP from a background thread, for processes without an API (Celery workers)."""
+    if not port:
+        return False
+    start_http_server(port, registry=collector_registry())
+    logger.info(f"Metrics exporter listening - Port: {port}, Multiprocess: {multiprocess_enabled()}")
+    return True
+
+
+def mark_process_dead(pid: int):
+    """Drop the live gauges of an exited process in multiprocess mode."""
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(pid)
+
+
+def _command_name(args) -> str:
+    name = args[0] if args else "UNKNOWN"
+    return (name.decode() if isinstance(name, bytes) else str(name)).upper()
+
+
+class TimedPipeline(redis.client.Pipeline):
+    def execute(self, raise_on_error: bool = True):
+        with REDIS_LATENCY.labels("PIPELINE").time():
+            return super().execute(raise_on_error)
+
+
+class TimedRedis(redis.Redis):
+    """Sync Redis client that records the latency of every command."""
+
+    def execute_command(self, *args, **options):
+        with REDIS_LATENCY.labels(_command_name(args)).time():
+            return super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint: Optional[str] = None) -> TimedPipeline:
+        return TimedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class TimedAsyncPipeline(aioredis.client.Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        with REDIS_LATENCY.labels("PIPELINE").time():
+            return await super().execute(raise_on_error)
+
+
+class TimedAsyncRedis(aioredis.Redis):
+    """asyncio Redis client that records the latency of every command."""
+
+    async def execute_command(self, *args, **options):
+        with REDIS_LATENCY.labels(_command_name(args)).time():
+            return await super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint: Optional[str] = None) -> TimedAsyncPipeline:
+        return TimedAsyncPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
@@ -1,65 +1,96 @@
 from app.config import *
-from app.utils import fetch_tao_dividends
+from app.utils import fetch_tao_dividends, get_current_user
+from app.clients import substrate_pool
+from app.metrics import DIVIDEND_CACHE_REQUESTS, SENTIMENT_FRESH_READS, SUBSTRATE_LATENCY, netuid_label
+from app.cache import (
+    publish_snapshot, get_current_snapshot, read_dividend, read_subnet_dividends,
+    read_all_dividends, read_hotkey_dividends, iter_snapshot_dividends
+)
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 import os
-from tasks.worker import analyze_sentiment, execute_sentiment_trade
+from tasks.worker import execute_sentiment_trade, is_sentiment_fresh, request_sentiment_refresh
+
+
+async def _cached_sentiment(netuid: int) -> Optional[dict]:
+    """Return the cached sentiment for `netuid`, queueing a refresh only when it is stale."""
+    pipe = async_redis_client.pipeline(transaction=False)
+    pipe.get(get_sentiment_cache_key(netuid))
+    pipe.zadd(get_sentiment_demand_key(), {netuid: time.time()})
+    cached, _ = await pipe.execute()
+    sentiment = json.loads(cached) if cached else None
+
+    if is_sentiment_fresh(sentiment):
+        # Counted in-process: a Redis round trip here would slow the hot path
+        SENTIMENT_FRESH_READS.inc()
+    else:
+        # Takes the per-netuid lock and publishes to the broker with the sync clients
+        await run_in_threadpool(request_sentiment_refresh, netuid)
+    return sentiment
+
+async def _iter_rows(rows):
+    for row in rows:
+        yield row
+
+def _stream_dividends(rows, block_hash: str) -> StreamingResponse:
+    """Stream (netuid, hotkey, value) rows from an async iterator as NDJSON, one object per line."""
+    async def ndjson():
+        async for netuid, hotkey, value in rows:
+            yield json.dumps({
+                "netuid": netuid,
+                "hotkey": hotkey,
+                "dividend": value,
+                "block_hash": block_hash
+            }) + "\n"
+
+    return StreamingResponse(
+        ndjson(),
+        media_type="application/x-ndjson",
+        headers={"X-Block-Hash": block_hash}
+    )
 
 @router.get("/tao-dividends/all")
-async def tao_dividends(current_user: dict = Depends(get_current_user)):
+async def tao_dividends(
+    stream: bool = Query(False, description="Stream rows as NDJSON, subnet by subnet"),
+    current_user: dict = Depends(get_current_user)
+):
     """
     Endpoint to fetch Tao Dividends per Subnet with caching.
     """
     try:
-        # Get cached block hash
-        block_hash = redis_client.get(get_block_hash_cache_key())
-        if not block_hash:
+        # Get the current snapshot's block hash
+        snapshot = await get_current_snapshot(async_redis_client)
+        if not snapshot:
             logger.info("No cached block hash found, fetching fresh data")
             # If no cache, fetch fresh data
             results, block_hash = await fetch_tao_dividends()
             
-            # Cache the fetched data
+            # Cache the fetched data; the writer is synchronous, so keep it off the event loop
             try:
-                for netuid, hotkey, value in results:
-                    cache_key = get_dividend_cache_key(netuid, hotkey)
-                    redis_client.set(cache_key, json.dumps(value), ex=CACHE_TTL)
-                    logger.info(f"Cached: netuid={netuid}, hotkey={hotkey}")
-                
-                # Cache the block hash
-                redis_client.set(get_block_hash_cache_key(), block_hash, ex=CACHE_TTL)
-                logger.info(f"Cached block hash: {block_hash}")
+                await run_in_threadpool(publish_snapshot, redis_client, block_hash, results)
             except Exception as e:
                 logger.error(f"Error caching data: {e}")
             
+            if stream:
+                return _stream_dividends(_iter_rows(results), block_hash)
             return {
                 "data": results,
                 "block_hash": block_hash,
                 "cached": False
             }
         
+        block_hash = snapshot["block_hash"]
+        if stream:
+            logger.info(f"Streaming cached dividend records for block {block_hash}")
+            return _stream_dividends(iter_snapshot_dividends(async_redis_client, snapshot), block_hash)
+
         # Get cached data
-        results = []
-        for netuid in range(1, 51):
-            try:
-                pattern = f"tao_dividend:{netuid}:*"
-                keys = redis_client.keys(pattern)
-                for key in keys:
-                    try:
-                        key_str = key.decode('utf-8')
-                        hotkey = key_str.split(':')[-1]
-                        netuid = key_str.split(':')[-2]
-                        value = redis_client.get(key)
-                        if value:
-                            results.append((netuid, hotkey))
-                    except Exception as e:
-                        logger.error(f"Error processing cache key {key}: {e}")
-                        continue
-            except Exception as e:
-                logger.error(f"Error processing netuid {netuid}: {e}")
-                continue
+        results = await read_all_dividends(async_redis_client, snapshot)
         
         logger.info(f"Returning {len(results)} cached dividend records")
         return {
             "data": results,
-            "block_hash": block_hash.decode('utf-8'),
+            "block_hash": block_hash,
             "cached": True
         }
     except Exception as e:
@@ -81,52 +112,49 @@ async def get_dividend(
     results = {}
 
     try:
+        # All cached reads come from the same block snapshot
+        snapshot = await get_current_snapshot(async_redis_client)
+        block_hash = snapshot["block_hash"] if snapshot else None
+
         # Condtion 1: Both Netuid & Hotkey are provided
         if netuid is not None and hotkey is not None:
-            cache_key = get_dividend_cache_key(netuid, hotkey)
-            cached_value = redis_client.get(cache_key)
+            cached_value = await read_dividend(async_redis_client, snapshot, netuid, hotkey) if snapshot else None
             
-            if cached_value:
+            DIVIDEND_CACHE_REQUESTS.labels("1", "hit" if cached_value is not None else "miss").inc()
+            if cached_value is not None:
                 logger.info(f"Cache hit for {netuid}/{hotkey}")
                 results = {
                     "netuid": netuid,
                     "hotkey": hotkey,
-                    "dividend": json.loads(cached_value),
+                    "dividend": cached_value,
+                    "block_hash": block_hash,
                     "cached": True,
                     "stake_tx_triggered": False
                 }
-            
-            logger.info(f"Cache miss for {netuid}/{hotkey}, fetching from chain")
+            else:
+                logger.info(f"Cache miss for {netuid}/{hotkey}, fetching from chain")
 
             
         # Condition 2: Netuid is provided but Hotkey is not
         elif netuid is not None and hotkey is None:
             
             # Check Valid SubnetID
-            if netuid not in range(1, 51):
+            if netuid not in SUBNET_NETUIDS:
                 raise HTTPException(status_code=400, detail=f"Invalid netuid provided: {netuid}")
             
-            cache_key = f"tao_dividend:{netuid}:*"
-            cached_values = redis_client.keys(cache_key)
+            cached_values = await read_subnet_dividends(async_redis_client, snapshot, netuid) if snapshot else {}
             
-            if cached_values and len(cached_values) > 0:
+            DIVIDEND_CACHE_REQUESTS.labels("2", "hit" if cached_values else "miss").inc()
+            if cached_values:
                 logger.info(f"Cache hit for netuid - {len(cached_values)} items")
-                data = []
-                
-                for key in cached_values:
-                    key_str = key.decode('utf-8')
-                    hotkey = key_str.split(':')[-1]
-                    netuid = key_str.split(':')[-2]
-                    value = redis_client.get(key)
-                    if value:
-                        data.append({
-                            "netuid": netuid,
-                            "hotkey": hotkey,
-                            "dividend": json.loads(value)
-                        })
+                data = [
+                    {"netuid": netuid, "hotkey": cached_hotkey, "dividend": value}
+                    for cached_hotkey, value in cached_values.items()
+                ]
                         
                 results = {
                     "data": data,
+                    "block_hash": block_hash,
                     "cached": True,
                     "stake_tx_triggered": False
                 }
@@ -138,27 +166,20 @@ async def get_dividend(
         # Condition 3: Hotkey is provided but Netuid is not
         elif netuid is None and hotkey is not None:
             
-            cache_key = f"tao_dividend:*:{str(hotkey)}"
-            cached_values = redis_client.keys(cache_key)
+            cached_values = await read_hotkey_dividends(async_redis_client, snapshot, hotkey) if snapshot else None
             
-            if cached_values and len(cached_values) > 0:
-                logger.info(f"Cache hit for hotkey - {len(cached_values)} items")
-                data = []
-                
-                for key in cached_values:
-                    key_str = key.decode('utf-8')
-                    hotkey = key_str.split(':')[-1]
-                    netuid = key_str.split(':')[-2]
-                    value = redis_client.get(key)
-                    if value:
-                        data.append({
-                            "netuid": netuid,
-                            "hotkey": str(hotkey),
-                            "dividend": json.loads(value)
-                        })
+            DIVIDEND_CACHE_REQUESTS.labels("3", "hit" if cached_values else "miss").inc()
+            if cached_values:
+                logger.info(f"Cache hit for hotkey - {len(cached_values['dividends'])} items")
+                data = [
+                    {"netuid": cached_netuid, "hotkey": hotkey, "dividend": value}
+                    for cached_netuid, value in cached_values["dividends"]
+                ]
                         
                 results = {
                     "data": data,
+                    "total_dividend": cached_values["total"],
+                    "block_hash": block_hash,
                     "cached": True,
                     "stake_tx_triggered": False
                 }
@@ -172,35 +193,27 @@ async def get_dividend(
             netuid = 18
             hotkey = "5FFApaS75bv5pJHfAp2FVLBj9ZaXuFDjEypsaBNc1wCfe52v"
 
-        analyze_sentiment.delay(netuid=netuid)
+        # Sentiment is tracked per subnet; a hotkey-only lookup has none to read or refresh
+        sentiment_result = await _cached_sentiment(netuid) if netuid is not None else None
 
         if len(results.keys()) == 0:
             # If not in cache, fetch from chain
-            cache_key = get_dividend_cache_key(netuid, hotkey)
-            
-            sentiment_cache_key = get_sentiment_cache_key(netuid)
-            sentiment_result = redis_client.get(sentiment_cache_key)
             if sentiment_result:
-                sentiment_result = json.loads(sentiment_result)
                 sentiment_score = sentiment_result.get("sentiment_score")
             else:
                 sentiment_score = "0"
             
             try:
-                async with AsyncSubstrateInterface("wss://entrypoint-finney.opentensor.ai:443",
-                                            ss58_format=SS58_FORMAT) as substrate:
-                    block_hash = await substrate.get_chain_head()
-                    result = await substrate.query(
-                        "SubtensorModule",
-                        "TaoDividendsPerSubnet",
-                        [netuid, hotkey],
-                        block_hash=block_hash
-                    )
+                async with substrate_pool.connection() as substrate:
+                    with SUBSTRATE_LATENCY.labels("query", netuid_label(netuid, SUBNET_NETUIDS)).time():
+                        result = await substrate.query(
+                            "SubtensorModule",
+                            "TaoDividendsPerSubnet",
+                            [netuid, hotkey]
+                        )
                     
                     if result and result.value:
-                        # Cache the result
-                        redis_client.set(cache_key, json.dumps(result.value), ex=CACHE_TTL)
-                        logger.info(f"Cached new value for {netuid}/{hotkey}")
+                        logger.info(f"Fetched value from chain for {netuid}/{hotkey}")
                         return {
                             "netuid": netuid,
                             "hotkey": hotkey,
@@ -1,13 +1,17 @@
 from app.config import *
+from app.cache import get_current_snapshot, l1_cache
+from app.utils import token_cache
 
 
 @router.get("/tao-dividends/status")
 async def get_update_status():
     """Get the current status of the dividends cache update"""
     try:
-        status = redis_client.get(get_update_status_key())
-        start_time = redis_client.get(get_update_start_time_key())
-        progress = redis_client.get(get_update_progress_key())
+        status, start_time, progress = await async_redis_client.mget(
+            get_update_status_key(),
+            get_update_start_time_key(),
+            get_update_progress_key()
+        )
         
         if not status:
             return {
@@ -34,12 +38,23 @@ async def get_redis_info():
     """Get information about Redis keys and their types"""
     try:
         # Get all keys matching our patterns
-        dividend_keys = redis_client.keys("tao_dividend:*")
-        status_keys = redis_client.keys("tao_dividend:update_*")
+        dividend_keys = await async_redis_client.keys("tao_dividend:*")
+        status_keys = await async_redis_client.keys("tao_dividend:update_*")
         
+        snapshot = await get_current_snapshot(async_redis_client)
+        history = await async_redis_client.lrange(get_snapshot_history_key(), 0, -1)
+        trade_flush = await async_redis_client.get(get_trade_flush_stats_key())
+        sentiment_refresh = await async_redis_client.hgetall(get_sentiment_refresh_stats_key())
+
         # Get key types and TTLs
         info = {
             "total_keys": len(dividend_keys) + len(status_keys),
+            "current_snapshot": snapshot["block_hash"] if snapshot else None,
+            "snapshots": [json.loads(m).get("block_hash") for m in history],
+            "l1_cache": l1_cache.stats(),
+            "token_cache": token_cache.stats(),
+            "trade_flush": json.loads(trade_flush) if trade_flush else None,
+            "sentiment_refresh": {k.decode(): int(v) for k, v in sentiment_refresh.items()},
             "keys_by_type": {},
             "status_keys": {},
             "dividend_keys_by_netuid": {}
@@ -48,37 +63,27 @@ async def get_redis_info():
         # Process status keys
         for key in status_keys:
             key_str = key.decode('utf-8')
-            key_type = redis_client.type(key).decode()
-            ttl = redis_client.ttl(key)
+            key_type = (await async_redis_client.type(key)).decode()
+            ttl = await async_redis_client.ttl(key)
             info["status_keys"][key_str] = {
                 "type": key_type,
                 "ttl": ttl if ttl > 0 else None
             }
         
-        # Process dividend keys
-        for key in dividend_keys:
-            key_str = key.decode('utf-8')
-            if key_str.startswith("tao_dividend:update_"):
-                continue  # Skip status keys we already processed
-                
-            key_type = redis_client.type(key).decode()
-            ttl = redis_client.ttl(key)
-            
-            # Extract netuid from key
-            parts = key_str.split(':')
-            if len(parts) >= 3 and parts[1].isdigit():
-                netuid = int(parts[1])
-                if netuid not in info["dividend_keys_by_netuid"]:
-                    info["dividend_keys_by_netuid"][netuid] = {
-                        "count": 0,
-                        "ttl": ttl if ttl > 0 else None
-                    }
-                info["dividend_keys_by_netuid"][netuid]["count"] += 1
+        # Process the current snapshot's subnet hashes
+        for netuid, fingerprint in (snapshot["subnets"].items() if snapshot else []):
+            key = get_dividend_cache_key(netuid, fingerprint)
+            ttl = await async_redis_client.ttl(key)
+            info["dividend_keys_by_netuid"][netuid] = {
+                "count": await async_redis_client.hlen(key),
+                "fingerprint": fingerprint,
+                "ttl": ttl if ttl > 0 else None
+            }
         
         # Count keys by type
         all_keys = dividend_keys + status_keys
         for key in all_keys:
-            key_type = redis_client.type(key).decode()
+            key_type = (await async_redis_client.type(key)).decode()
             if key_type not in info["keys_by_type"]:
                 info["keys_by_type"][key_type] = 0
             info["keys_by_type"][key_type] += 1
@@ -0,0 +1,78 @@
+from typing import Dict, List, Optional
+import re
+import numpy as np
+
+# Word -> valence in [-4, 4], tuned for crypto / Bittensor chatter
+LEXICON: Dict[str, float] = {
+    # Positive
+    "bullish": 3.0, "moon": 2.5, "mooning": 3.0, "pump": 1.5, "pumping": 2.0, "rally": 2.5, "breakout": 2.5,
+    "ath": 2.5, "gain": 2.0, "gains": 2.0, "profit": 2.0, "profits": 2.0, "growth": 2.0, "growing": 1.5,
+    "up": 1.0, "higher": 1.5, "strong": 2.0, "stronger": 2.0, "great": 3.0, "good": 2.0, "best": 3.0,
+    "amazing": 3.5, "awesome": 3.5, "excellent": 3.5, "love": 3.0, "excited": 3.0, "exciting": 3.0,
+    "impressive": 3.0, "innovative": 2.5, "promising": 2.5, "undervalued": 2.0, "buy": 1.5, "buying": 1.5,
+    "accumulate": 1.5, "accumulating": 1.5, "support": 1.0, "partnership": 2.0, "launch": 1.5, "launched": 1.5,
+    "upgrade": 1.5, "win": 2.5, "winning": 2.5, "success": 3.0, "successful": 3.0, "solid": 2.0, "gem": 2.5,
+    "adoption": 2.0, "revenue": 1.5, "lfg": 3.0, "wagmi": 2.5, "hodl": 1.5, "happy": 3.0, "nice": 2.0,
+    # Negative
+    "bearish": -3.0, "dump": -2.5, "dumping": -3.0, "crash": -3.5, "crashed": -3.5, "crashing": -3.5,
+    "rekt": -3.0, "loss": -2.5, "losses": -2.5, "down": -1.0, "lower": -1.5, "weak": -2.0, "weaker": -2.0,
+    "bad": -2.5, "worst": -3.5, "terrible": -3.5, "awful": -3.5, "hate": -3.0, "scam": -4.0, "rug": -4.0,
+    "rugged": -4.0, "fraud": -4.0, "hack": -3.0, "hacked": -3.5, "exploit": -3.0, "exploited": -3.5,
+    "sell": -1.5, "selling": -1.5, "fud": -2.0, "fear": -2.5, "panic": -3.0, "overvalued": -2.0,
+    "dead": -3.0, "failing": -3.0, "failed": -3.0, "fail": -3.0, "broken": -2.5, "bug": -1.5, "risk": -1.0,
+    "risky": -1.5, "concern": -1.5, "concerns": -1.5, "problem": -2.0, "problems": -2.0, "decline": -2.0,
+    "declining": -2.0, "ngmi": -2.5, "disappointed": -3.0, "disappointing": -3.0, "sad": -2.5, "ponzi": -4.0,
+}
+
+NEGATIONS = frozenset({
+    "not", "no", "never", "none", "nobody", "nothing", "neither", "nor", "without", "hardly",
+    "dont", "don't", "isnt", "isn't", "wasnt", "wasn't", "cant", "can't", "wont", "won't", "aint", "ain't",
+})
+NEGATION_FACTOR = -0.74  # A negated word flips and weakens, as in VADER
+NORMALIZATION_ALPHA = 15.0  # Larger values need more sentiment words to approach the +/-100 bounds
+
+_TOKEN = re.compile(r"[a-z][a-z']*")
+
+
+class LexiconScorer:
+    """Local tweet scorer: summed word valences, with negation, squashed into -100..+100.
+
+    A batch is scored with array operations over all of its tokens at once,
+    so thousands of tweets take milliseconds and never touch the network.
+    """
+
+    def __init__(self, lexicon: Optional[Dict[str, float]] = None):
+        lexicon = lexicon if lexicon is not None else LEXICON
+        self.vocabulary = {word: index for index, word in enumerate(lexicon)}
+        # Index len(lexicon) is the zero-valence slot for words outside the lexicon
+        self.valences = np.append(np.fromiter(lexicon.values(), dtype=np.float64, count=len(lexicon)), 0.0)
+
+    def _encode(self, tweets: List[str]):
+        """Flatten a batch into token ids, negation flags and the tweet index of each token."""
+        unknown = len(self.vocabulary)
+        ids: List[int] = []
+        negations: List[bool] = []
+        owners: List[int] = []
+        for owner, tweet in enumerate(tweets):
+            tokens = _TOKEN.findall(tweet.lower())
+            ids.extend(self.vocabulary.get(token, unknown) for token in tokens)
+            negations.extend(token in NEGATIONS for token in tokens)
+            owners.extend([owner] * len(tokens))
+        return np.array(ids, dtype=np.intp), np.array(negations, dtype=bool), np.array(owners, dtype=np.intp)
+
+    @staticmethod
+    def _negated(negations: np.ndarray, owners: np.ndarray) -> np.ndarray:
+        """Flag tokens within two words after a negation in the same tweet."""
+        negated = np.zeros(len(negations), dtype=bool)
+        for shift in (1, 2):
+            negated[shift:] |= negations[:-shift] & (owners[:-shift] == owners[shift:])
+        return negated
+
+    def score(self, tweets: List[str]) -> np.ndarray:
+        """Score every tweet in `tweets`, returning a float array in [-100, 100]."""
+        if not tweets:
+            return np.zeros(0)
+        ids, negations, owners = self._encode(tweets)
+        weights = self.valences[ids] * np.where(self._negated(negations, owners), NEGATION_FACTOR, 1.0)
+        totals = np.bincount(owners, weights=weights, minlength=len(tweets))
+        return 100.0 * totals / np.sqrt(totals * totals + NORMALIZATION_ALPHA)
@@ -3,15 +3,23 @@ from app.config import *
 from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext # type: ignore
 from fastapi import HTTPException, Security
-from typing import Optional
+from typing import Optional, Any, List, Tuple
 from jose import jwt, JWTError # type: ignore
 from datetime import datetime, timedelta, timezone
 import json
 import os
+import hashlib
 
 import subprocess
 import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from app.clients import substrate_pool
+from app.cache import L1Cache
+from app.metrics import SUBSTRATE_LATENCY, netuid_label
 
+logger = logging.getLogger(__name__)
 
 # Usage
 # balance_info = get_tao_balance()
@@ -19,15 +27,38 @@ import time
 
 
 # Load fake users database
-def load_fake_users_db():
+def load_fake_users_db(path: str = USERS_DB_PATH):
     try:
-        with open("fake_users_db.json", "r") as f:
+        with open(path, "r") as f:
             return json.load(f)
     except Exception as e:
-        logging.error(f"Error loading fake_users_db.json: {e}")
+        logging.error(f"Error loading {path}: {e}")
         return {}
 
-fake_users_db = load_fake_users_db()
+class UserStore:
+    """In-memory users database, reloaded only when the file's mtime changes."""
+
+    def __init__(self, path: str = USERS_DB_PATH):
+        self.path = path
+        self._mtime: Optional[float] = None
+        self._users: dict = {}
+
+    def get(self, username: str) -> Optional[dict]:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError as e:
+            logger.error(f"Error checking {self.path}: {e}")
+            return self._users.get(username)
+        if mtime != self._mtime:
+            self._users = load_fake_users_db(self.path)
+            self._mtime = mtime
+            logger.info(f"Loaded {len(self._users)} users from {self.path}")
+        return self._users.get(username)
+
+fake_users_db = UserStore()
+
+# bcrypt is deliberately slow, so verification runs on a bounded pool instead of the event loop
+password_executor = ThreadPoolExecutor(max_workers=AUTH_HASH_WORKERS, thread_name_prefix="password-verify")
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
@@ -38,19 +69,29 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Already-verified bearer tokens: sha256(token) -> username, each evicted at the token's exp
+token_cache = L1Cache(maxsize=TOKEN_CACHE_SIZE, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60, enabled=True)
+
 # Function to decode JWT token and get current user
-def get_current_user(token: str = Security(oauth2_scheme)):
+async def get_current_user(token: str = Security(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=401,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    token_key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    username = token_cache.get(token_key)
+    if username is not None:
+        return {"username": username}
     try:
         # Decode the JWT token
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
+        expires_in = payload.get("exp", 0) - time.time()
+        if expires_in > 0:
+            token_cache.set(token_key, username, ttl=expires_in)
         return {"username": username}  # You can add more user info here
     except JWTError:
         raise credentials_exception
@@ -59,13 +100,12 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 # Function to authenticate the user
-def authenticate_user(username: str, password: str) -> Optional[dict]:
-    # Reload the database in case it was updated
-    users_db = load_fake_users_db()
-    user = users_db.get(username)
+async def authenticate_user(username: str, password: str) -> Optional[dict]:
+    user = fake_users_db.get(username)
     if not user:
         return None
-    if not verify_password(password, user["hashed_password"]):
+    loop = asyncio.get_running_loop()
+    if not await loop.run_in_executor(password_executor, verify_password, password, user["hashed_password"]):
         return None
     return user
 
@@ -97,29 +137,44 @@ async def exhaust(qmr):
         r.append((k, v))
     return r
 
+# Fetch TaoDividendsPerSubnet for many subnets concurrently over one substrate connection
+async def fetch_subnet_dividends(substrate, block_hash: str, netuids=SUBNET_NETUIDS,
+                                 concurrency: int = SUBSTRATE_FETCH_CONCURRENCY,
+                                 skip_failed: bool = False) -> List[Tuple[int, str, Any]]:
+    # Imported here so the API only loads bittensor when it actually goes to the chain
+    from bittensor.core.chain_data import decode_account_id
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(netuid):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                with SUBSTRATE_LATENCY.labels("query_map", netuid_label(netuid, SUBNET_NETUIDS)).time():
+                    result = await exhaust(substrate.query_map(
+                        "SubtensorModule",
+                        "TaoDividendsPerSubnet",
+                        [netuid],
+                        block_hash=block_hash
+                    ))
+            except Exception as e:
+                logger.error(f"Error fetching dividends for netuid {netuid}: {e}")
+                if skip_failed:
+                    return []
+                raise
+            rows = [(netuid, decode_account_id(k), v.value) for k, v in result]
+            logger.info(f"Fetched netuid {netuid}: {len(rows)} rows in {(time.perf_counter() - start) * 1000:.0f}ms")
+            return rows
+
+    results = await asyncio.gather(*(fetch(netuid) for netuid in netuids))
+    return [row for rows in results for row in rows]
+
 # Asynchronous function to fetch the TaoDividendsPerSubnet data
 async def fetch_tao_dividends():
     start = time.time()
     try:
-        async with AsyncSubstrateInterface("wss://entrypoint-finney.opentensor.ai:443",
-                                       ss58_format=SS58_FORMAT) as substrate:
+        async with substrate_pool.connection() as substrate:
             block_hash = await substrate.get_chain_head()
-            tasks = [
-                (netuid, substrate.query_map(
-                    "SubtensorModule",
-                    "TaoDividendsPerSubnet",
-                    [netuid],
-                    block_hash=block_hash
-                )) for netuid in range(1, 51)
-            ]
-            results_dicts_list = []
-            for netuid, future in tasks:
-                try:
-                    result = await exhaust(future)
-                    results_dicts_list.extend([(netuid, decode_account_id(k), v.value) for k, v in result])
-                except Exception as e:
-                    logger.error(f"Error processing query map result: {e}")
-                    continue
+            results_dicts_list = await fetch_subnet_dividends(substrate, block_hash, skip_failed=True)
 
         elapsed = time.time() - start
         logger.info(f"Time elapsed for fetch_tao_dividends: {elapsed:.2f}s")
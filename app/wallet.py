@@ -0,0 +1,387 @@
+# wallet.py
+# Bittensor wallet and subtensor access. Kept out of app.clients so that
+# importing the API never loads bittensor; only the Celery worker needs it.
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
+import bittensor as bt
+from app.config import *
+from bittensor import wallet as Wallet
+import asyncio
+import logging
+import time
+from functools import lru_cache
+from bittensor import Keypair
+from bittensor.core.errors import SubstrateRequestException
+from bittensor.utils import format_error_message
+from bittensor.utils.balance import Balance
+from app.metrics import WALLET_BALANCE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def _keypair_from_mnemonic(mnemonic: str) -> Keypair:
+    """Derive the keypair for a mnemonic, once per process."""
+    return Keypair.create_from_mnemonic(mnemonic)
+
+
+def load_wallet(name: str, hotkey: str, path: str, mnemonic: str) -> Wallet:
+    """Open a wallet, reusing its key files when they match `mnemonic`.
+
+    Only the public coldkey and the hotkey are read to check the addresses.
+    The keys are written from the derived keypair only when they are missing
+    or belong to a different mnemonic.
+    """
+    w = Wallet(name=name, hotkey=hotkey, path=path)
+    keypair = _keypair_from_mnemonic(mnemonic)
+    try:
+        if w.coldkeypub.ss58_address == keypair.ss58_address and w.hotkey.ss58_address == keypair.ss58_address:
+            logger.info(f"Loaded wallet keys from disk - Name: {name}, Coldkey: {keypair.ss58_address}")
+            return w
+        logger.warning(f"Wallet keys on disk don't match the configured mnemonic - Name: {name}")
+    except Exception as e:
+        logger.info(f"Wallet keys not found on disk - Name: {name}, Error: {str(e)}")
+
+    w.set_coldkey(keypair, encrypt=False, overwrite=True)
+    w.set_coldkeypub(keypair, overwrite=True)
+    w.set_hotkey(keypair, encrypt=False, overwrite=True)
+    logger.info(f"Wrote wallet keys from mnemonic - Name: {name}, Coldkey: {keypair.ss58_address}")
+    return w
+
+
+class BittensorWallet:
+    def __init__(self, wallet_path: Optional[str] = None):
+        self.wallet_path = wallet_path or "~/.bittensor/wallets/"
+        self.wallet_name = BITTENSOR_WALLET_NAME
+        self.hotkey = BITTENSOR_WALLET_HOTKEY
+        self.mnemonic = BITTENSOR_MNEMONIC
+        
+        # Faucet info
+        self.faucet_mnemonic = "diamond like interest affair safe clarify lawsuit innocent beef van grief color"
+        self.faucet_wallet_name = "faucet"
+        self.faucet_hotkey = "default"
+        self.max_faucet_transfer = 40.0
+        self._faucet_wallet: Optional[Wallet] = None
+        self._connection: Optional[asyncio.Future] = None
+        self._connection_loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Balance cache: coldkey -> (expiry on time.monotonic(), TAO). Entries are
+        # served for BALANCE_CACHE_TTL, so a transfer we didn't make ourselves can
+        # take that long to show; our own extrinsics update or drop the entry.
+        self._balances: Dict[str, Tuple[float, float]] = {}
+
+        # Create wallet directory if it doesn't exist
+        Path(self.wallet_path).mkdir(parents=True, exist_ok=True)
+        
+        # Initialize wallet and subtensor
+        self.wallet = self._initialize_wallet()
+        self.subtensor = self._initialize_subtensor()
+        
+    def _initialize_wallet(self) -> Wallet:
+        """Initialize or create wallet."""
+        try:
+            if self.mnemonic:
+                w = load_wallet(self.wallet_name, self.hotkey, self.wallet_path, self.mnemonic)
+            else:
+                w = Wallet(
+                    name=self.wallet_name,
+                    hotkey=self.hotkey,
+                    path=self.wallet_path
+                )
+
+            # Try accessing keys to validate wallet
+            try:
+                _ = w.coldkeypub.ss58_address
+                _ = w.hotkey.ss58_address
+                logger.info(f"Wallet initialized - Name: {self.wallet_name}, Coldkey: {w.coldkeypub.ss58_address}, Hotkey: {w.hotkey.ss58_address}")
+            except Exception:
+                # Keys are missing — create new wallet
+                logger.info(f"Creating new wallet - Name: {self.wallet_name}")
+                w.create()
+                self.hotkey = w.hotkey.ss58_address
+                logger.info(f"New wallet created - Coldkey: {w.coldkeypub.ss58_address}, Hotkey: {w.hotkey.ss58_address}")
+
+            return w
+
+        except Exception as e:
+            logger.error(f"Wallet initialization failed - Error: {str(e)}")
+            raise
+            
+    def _initialize_subtensor(self) -> bt.AsyncSubtensor:
+        """Create the testnet client. No I/O happens until `connect()`."""
+        return bt.AsyncSubtensor(network="test")
+
+    async def _open_subtensor(self):
+        try:
+            await self.subtensor.initialize()
+            logger.info("Connected to Bittensor testnet successfully")
+        except Exception as e:
+            logger.error(f"Failed to connect to Bittensor testnet - Error: {str(e)}")
+            self._connection = None
+            raise
+
+    async def connect(self) -> bt.AsyncSubtensor:
+        """Open the subtensor connection once per event loop and reuse it for every call.
+
+        Concurrent callers share the same connection attempt.
+        """
+        loop = asyncio.get_running_loop()
+        if self._connection is None or self._connection_loop is not loop:
+            if self._connection_loop is not None and self._connection_loop is not loop:
+                # The old websocket belongs to another event loop and can't be reused here
+                self.subtensor = self._initialize_subtensor()
+            self._connection_loop = loop
+            self._connection = asyncio.ensure_future(self._open_subtensor())
+        await asyncio.shield(self._connection)
+        return self.subtensor
+
+    async def close(self):
+        """Close the subtensor connection opened by `connect()`."""
+        if self._connection is None:
+            return
+        self._connection = None
+        self._connection_loop = None
+        try:
+            await self.subtensor.close()
+            logger.info("Closed Bittensor testnet connection")
+        except Exception as e:
+            logger.warning(f"Error closing subtensor connection - Error: {str(e)}")
+
+    async def __aenter__(self) -> "BittensorWallet":
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _get_faucet_wallet(self) -> Wallet:
+        """Load the faucet wallet on first use and keep it for later top-ups."""
+        if self._faucet_wallet is None:
+            self._faucet_wallet = load_wallet(
+                self.faucet_wallet_name, self.faucet_hotkey, self.wallet_path, self.faucet_mnemonic
+            )
+        return self._faucet_wallet
+
+    async def _fund_if_needed(self):
+        """Fund the wallet from the faucet if balance is low."""
+        try:
+            current_balance = await self.get_tao_balance()
+            if current_balance is not None and current_balance < 1.0:
+                logger.info(f"Wallet balance low ({current_balance:.4f} TAO) - Attempting faucet funding")
+
+                faucet_wallet = self._get_faucet_wallet()
+                faucet_coldkey = faucet_wallet.coldkeypub.ss58_address
+
+                faucet_balance = await self.get_tao_balance(faucet_coldkey)
+                if faucet_balance is None or faucet_balance < self.max_faucet_transfer:
+                    logger.warning(f"Faucet wallet has insufficient funds ({faucet_balance or 0.0:.4f} TAO)")
+                    return
+
+                subtensor = await self.connect()
+                result = await subtensor.transfer(
+                    wallet=faucet_wallet,
+                    dest=self.wallet.coldkeypub.ss58_address,
+                    amount=Balance.from_tao(self.max_faucet_transfer),
+                    wait_for_inclusion=True
+                )
+                if result:
+                    self._adjust_cached_balance(faucet_coldkey, -self.max_faucet_transfer)
+                    self._adjust_cached_balance(self.wallet.coldkeypub.ss58_address, self.max_faucet_transfer)
+
+                logger.info(f"Faucet funding successful - Amount: {self.max_faucet_transfer:.4f} TAO")
+            else:
+                logger.info(f"Wallet has sufficient balance: {current_balance:.4f} TAO")
+
+        except Exception as e:
+            logger.error(f"Faucet funding failed - Error: {str(e)}")
+            raise
+
+    async def get_wallet_info(self) -> dict:
+        """Get current balance of wallet."""
+        try:
+            balance = await self.get_tao_balance()
+            return {
+                "wallet_name": self.wallet_name,
+                "hotkey": self.hotkey,
+                "tao_balance": balance or 0.0
+            }
+        except Exception as e:
+            logger.error(f"Error getting wallet info: {str(e)}")
+            return {
+                "wallet_name": self.wallet_name,
+                "hotkey": self.hotkey,
+                "tao_balance": 0.0
+            }
+
+    async def add_stake(self, netuid: int, hotkey: str, amount: float) -> Dict[str, Any]:
+        """Add stake to a hotkey."""
+        try:
+            amount_balance = Balance.from_tao(amount).set_unit(netuid)
+            logger.info(f"Preparing stake - Netuid: {netuid}, Hotkey: {hotkey}, Amount: {amount_balance.tao:.4f} TAO")
+            
+            await self._fund_if_needed()
+
+            subtensor = await self.connect()
+            result = await subtensor.add_stake(
+                wallet=self.wallet,
+                netuid=netuid,
+                hotkey_ss58=hotkey,
+                amount=amount_balance,
+                allow_partial_stake=True,
+                safe_staking=True
+            )
+            if result:
+                # Staked TAO leaves the free balance; fees are reconciled on the next block
+                self._adjust_cached_balance(self.wallet.coldkeypub.ss58_address, -amount_balance.tao)
+            
+            logger.info(f"Stake successful - Netuid: {netuid}, Hotkey: {hotkey}, Amount: {amount_balance.tao:.4f} TAO")
+            return {
+                "success": True,
+                "result": result
+            }
+        except Exception as e:
+            logger.error(f"Stake failed - Netuid: {netuid}, Hotkey: {hotkey}, Error: {str(e)}")
+            return {"success": False, "error": str(e)}
+            
+    async def unstake(self, netuid: int, hotkey: str, amount: float) -> Dict[str, Any]:
+        """Remove stake from a hotkey."""
+        try:
+            amount_balance = Balance.from_tao(amount).set_unit(netuid)
+            logger.info(f"Preparing unstake - Netuid: {netuid}, Hotkey: {hotkey}, Amount: {amount_balance.tao:.4f} TAO")
+
+            subtensor = await self.connect()
+            result = await subtensor.unstake(
+                wallet=self.wallet,
+                netuid=netuid,
+                hotkey_ss58=hotkey,
+                amount=amount_balance,
+                allow_partial_stake=True,
+                safe_staking=True
+            )
+            # TAO returned depends on the subnet price, so refetch instead of guessing
+            self._balances.pop(self.wallet.coldkeypub.ss58_address, None)
+            
+            logger.info(f"Unstake successful - Netuid: {netuid}, Hotkey: {hotkey}, Amount: {amount_balance.tao:.4f} TAO")
+            return {
+                "success": True,
+                "result": result
+            }
+        except Exception as e:
+            logger.error(f"Unstake failed - Netuid: {netuid}, Hotkey: {hotkey}, Error: {str(e)}")
+            return {"success": False, "error": str(e)}
+            
+    async def _submit_batch(self, call_function: str, amount_param: str, price_factor: float,
+                            targets: List[Tuple[int, str, float]]) -> Dict[str, Any]:
+        """Submit one price-limited SubtensorModule call per target as a single atomic `Utility.batch_all` extrinsic.
+
+        Each call carries the same limit price and partial fill that
+        `safe_staking=True, allow_partial_stake=True` gives a single trade:
+        the subnet price times `price_factor`. Either every call is applied
+        or none is. `uncertain` is set when the extrinsic was sent but its
+        outcome is unknown (e.g. the connection dropped), so the caller must
+        not resubmit it blindly.
+        """
+        subtensor = await self.connect()
+        netuids = sorted({netuid for netuid, _, _ in targets})
+        pools = dict(zip(netuids, await asyncio.gather(*(subtensor.subnet(netuid=netuid) for netuid in netuids))))
+        calls = await asyncio.gather(*(
+            subtensor.substrate.compose_call(
+                call_module="SubtensorModule",
+                call_function=call_function,
+                call_params={
+                    "hotkey": hotkey,
+                    "netuid": netuid,
+                    amount_param: Balance.from_tao(amount).rao,
+                    "limit_price": round(pools[netuid].price.rao * price_factor),
+                    "allow_partial": True,
+                }
+            )
+            for netuid, hotkey, amount in targets
+        ))
+        batch = await subtensor.substrate.compose_call(
+            call_module="Utility",
+            call_function="batch_all",
+            call_params={"calls": list(calls)}
+        )
+        # Nonce lookup and signing can fail, but nothing has been sent yet, so the caller may retry
+        nonce = await subtensor.substrate.get_account_next_index(self.wallet.coldkeypub.ss58_address)
+        extrinsic = await subtensor.substrate.create_signed_extrinsic(call=batch, keypair=self.wallet.coldkey, nonce=nonce)
+        try:
+            response = await subtensor.substrate.submit_extrinsic(
+                extrinsic,
+                wait_for_inclusion=True,
+                wait_for_finalization=False
+            )
+            if await response.is_success:
+                return {"success": True, "error": None, "extrinsics": 1, "uncertain": False}
+            return {"success": False, "error": format_error_message(await response.error_message),
+                    "extrinsics": 1, "uncertain": False}
+        except SubstrateRequestException as e:
+            # The node rejected the extrinsic, so it was never included
+            return {"success": False, "error": format_error_message(e), "extrinsics": 1, "uncertain": False}
+        except Exception as e:
+            return {"success": False, "error": str(e), "extrinsics": 1, "uncertain": True}
+
+    async def add_stake_multiple(self, stakes: List[Tuple[int, str, float]]) -> Dict[str, Any]:
+        """Stake to several (netuid, hotkey, amount) targets with one atomic batch extrinsic."""
+        try:
+            total = sum(amount for _, _, amount in stakes)
+            logger.info(f"Preparing batch stake - Targets: {len(stakes)}, Total: {total:.4f} TAO")
+
+            await self._fund_if_needed()
+
+            result = await self._submit_batch("add_stake_limit", "amount_staked", 1 + STAKE_RATE_TOLERANCE, stakes)
+            if result["success"] or result["uncertain"]:
+                # A stake past its limit price fills partially, so re-read what actually left the balance
+                self._balances.pop(self.wallet.coldkeypub.ss58_address, None)
+
+            logger.info(f"Batch stake {'successful' if result['success'] else 'failed'} - Targets: {len(stakes)}, Total: {total:.4f} TAO")
+            return result
+        except Exception as e:
+            # Raised before anything was submitted
+            logger.error(f"Batch stake failed - Targets: {len(stakes)}, Error: {str(e)}")
+            return {"success": False, "error": str(e), "extrinsics": 0, "uncertain": False}
+
+    async def unstake_multiple(self, unstakes: List[Tuple[int, str, float]]) -> Dict[str, Any]:
+        """Unstake from several (netuid, hotkey, amount) targets with one atomic batch extrinsic."""
+        try:
+            logger.info(f"Preparing batch unstake - Targets: {len(unstakes)}")
+
+            result = await self._submit_batch("remove_stake_limit", "amount_unstaked", 1 - STAKE_RATE_TOLERANCE, unstakes)
+            if result["success"] or result["uncertain"]:
+                # The TAO received depends on the subnet price, so re-read it
+                self._balances.pop(self.wallet.coldkeypub.ss58_address, None)
+
+            logger.info(f"Batch unstake {'successful' if result['success'] else 'failed'} - Targets: {len(unstakes)}")
+            return result
+        except Exception as e:
+            logger.error(f"Batch unstake failed - Targets: {len(unstakes)}, Error: {str(e)}")
+            return {"success": False, "error": str(e), "extrinsics": 0, "uncertain": False}
+
+    def _adjust_cached_balance(self, coldkey: str, delta: float):
+        """Apply the effect of our own extrinsic to a cached balance."""
+        cached = self._balances.get(coldkey)
+        if cached is not None:
+            self._balances[coldkey] = (cached[0], cached[1] + delta)
+
+    async def get_tao_balance(self, coldkey: Optional[str] = None) -> Optional[float]:
+        """Get TAO balance from subtensor, served from cache for BALANCE_CACHE_TTL."""
+        coldkey = coldkey or self.wallet.coldkeypub.ss58_address
+        cached = self._balances.get(coldkey)
+        if cached is not None and cached[0] > time.monotonic():
+            WALLET_BALANCE_LOOKUPS.labels("hit").inc()
+            return cached[1]
+        WALLET_BALANCE_LOOKUPS.labels("miss").inc()
+        try:
+            subtensor = await self.connect()
+            balance = await subtensor.get_balance(coldkey)
+            if balance is not None:
+                logger.info(f"Current wallet balance: {balance.tao:.4f} TAO")
+                self._balances[coldkey] = (time.monotonic() + BALANCE_CACHE_TTL, balance.tao)
+                return balance.tao
+            else:
+                logger.warning("No balance found for wallet")
+                return 0.0
+        except Exception as e:
+            logger.error(f"Failed to get wallet balance - Error: {str(e)}")
+            return None
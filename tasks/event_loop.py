@@ -0,0 +1,86 @@
+from typing import Any, Awaitable, Callable, Optional
+import os
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerLoop:
+    """One long-lived event loop per worker process, running on a background thread.
+
+    Celery runs tasks synchronously, so async task bodies are submitted to this
+    loop with `run` and the task thread waits for the result. Clients bound to
+    the loop (substrate, aiohttp sessions, the subtensor websocket) therefore
+    stay connected across tasks, and with `--pool threads` the coroutines of
+    concurrent tasks interleave on the same loop.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        # A loop inherited through fork has no thread in this process
+        return self._loop is not None and self._pid == os.getpid() and self._loop.is_running()
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        """Start the loop if this process doesn't have one yet, and return it."""
+        with self._lock:
+            if self.running:
+                return self._loop
+            loop = asyncio.new_event_loop()
+            started = threading.Event()
+            loop.call_soon(started.set)
+            thread = threading.Thread(target=loop.run_forever, name="worker-event-loop", daemon=True)
+            thread.start()
+            started.wait()
+            self._loop, self._thread, self._pid = loop, thread, os.getpid()
+            logger.info(f"Worker event loop started - PID: {self._pid}")
+            return loop
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """Run `coro` on the worker loop from a task thread and return its result.
+
+        The thread pool doesn't enforce Celery's time limits, so callers pass
+        `timeout`; on expiry the coroutine is cancelled and TimeoutError raised.
+        """
+        loop = self.start()
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("run() called from the worker event loop; await the coroutine instead")
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            # Timed out or interrupted: cancel it so it doesn't keep running on the loop
+            future.cancel()
+            raise
+
+    def stop(self, cleanup: Optional[Callable[[], Awaitable[Any]]] = None, timeout: float = 30):
+        """Run `cleanup` on the loop, then stop the loop and join its thread."""
+        with self._lock:
+            if not self.running:
+                return
+            loop, thread = self._loop, self._thread
+            if cleanup is not None:
+                try:
+                    asyncio.run_coroutine_threadsafe(cleanup(), loop).result(timeout)
+                except Exception as e:
+                    logger.error(f"Error cleaning up worker event loop - Error: {str(e)}")
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            loop.close()
+            self._loop = self._thread = self._pid = None
+            logger.info("Worker event loop stopped")
+
+
+worker_loop = WorkerLoop()
+
+
+def run_async(coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+    """Run `coro` to completion on this process's worker event loop."""
+    return worker_loop.run(coro, timeout)
@@ -1,30 +1,60 @@
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Tuple
+from functools import lru_cache, partial
 from celery import Celery
-from app.clients import BittensorWallet, DaturaClient, LLMClient
+from app.clients import DaturaClient, LLMClient, SubstratePool
+from app.cache import publish_snapshot
+from app.metrics import (
+    TimedRedis, UPDATE_DURATION, UPDATE_ROWS, UPDATE_ROWS_WRITTEN, mark_process_dead, start_exporter
+)
+from app.utils import fetch_subnet_dividends
 from app.config import (
-    REDIS_HOST, REDIS_PORT, REDIS_DB, CACHE_TTL,
-    get_dividend_cache_key, get_block_hash_cache_key, get_sentiment_cache_key,
+    REDIS_HOST, REDIS_PORT, REDIS_DB, CACHE_TTL, TRADE_NET_WINDOW, WORKER_METRICS_PORT,
+    SENTIMENT_STALE_AFTER, SENTIMENT_REFRESH_INTERVAL, SENTIMENT_DEMAND_WINDOW, SENTIMENT_BATCH_SIZE, TWEET_SCORE_TTL,
+    SENTIMENT_LLM_DEADLINE, LEXICON_SCORE_TTL,
+    get_sentiment_cache_key, get_sentiment_lock_key, get_sentiment_demand_key, get_sentiment_refresh_stats_key, get_tweet_sentiment_key, get_trade_intents_key, get_trade_intent_counts_key, get_trade_flush_stats_key,
     get_update_status_key, get_update_start_time_key, get_update_progress_key
 )
 import redis
 import random
+import time
 import asyncio
+import os
 import logging
-from async_substrate_interface.async_substrate import AsyncSubstrateInterface
-from bittensor.core.chain_data import decode_account_id
-from bittensor.core.settings import SS58_FORMAT
 import json
+import xxhash
 from celery.exceptions import MaxRetriesExceededError
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown, worker_shutdown
 from celery.utils.log import get_task_logger
 from datetime import datetime
+from tasks.event_loop import run_async, worker_loop
 
 # Configure logging
 logger = get_task_logger(__name__)
 
-# Initialize clients
-datura_client = DaturaClient()
-llm_client = LLMClient()
-wallet = BittensorWallet()
+# Clients are created on first use, so importing this module (as the API does
+# to enqueue tasks) never builds them or loads bittensor. Inside a worker they
+# live as long as the process and are used from its persistent event loop.
+@lru_cache(maxsize=None)
+def get_substrate_pool() -> SubstratePool:
+    return SubstratePool(size=1)
+
+@lru_cache(maxsize=None)
+def get_datura_client() -> DaturaClient:
+    return DaturaClient()
+
+@lru_cache(maxsize=None)
+def get_llm_client() -> LLMClient:
+    return LLMClient()
+
+@lru_cache(maxsize=None)
+def get_lexicon_scorer():
+    from app.sentiment import LexiconScorer
+    return LexiconScorer()
+
+@lru_cache(maxsize=None)
+def get_wallet():
+    from app.wallet import BittensorWallet
+    return BittensorWallet()
 
 # Initialize Celery
 celery_app = Celery('tasks.worker', broker=f'redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}')
@@ -51,78 +81,122 @@ celery_app.conf.update(
                 'expires': 15.0,  # Task expires after 30 seconds if not picked up
             }
         },
+        'refresh-stale-sentiments': {
+            'task': 'tasks.worker.refresh_stale_sentiments',
+            'schedule': SENTIMENT_REFRESH_INTERVAL,
+            'options': {
+                'expires': SENTIMENT_REFRESH_INTERVAL,
+            }
+        },
+        'flush-trade-intents': {
+            'task': 'tasks.worker.flush_trade_intents',
+            'schedule': TRADE_NET_WINDOW,
+            'options': {
+                'expires': TRADE_NET_WINDOW,
+            }
+        },
     }
 )
 
-# Initialize Redis client
-try:
-    redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB)
-    redis_client.ping()  # Test connection
-    logger.info("Successfully connected to Redis")
-except redis.ConnectionError as e:
-    logger.error(f"Failed to connect to Redis: {e}")
-    raise
-
-async def exhaust(qmr):
-    r = []
-    async for k, v in await qmr:
-        r.append((k, v))
-    return r
+# Initialize Redis client; it connects on first command
+redis_client = TimedRedis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB)
+
+# The threads pool ignores task_time_limit / task_soft_time_limit, so every
+# async task body is bounded explicitly when handed to the worker loop
+TASK_TIMEOUT = celery_app.conf.task_soft_time_limit
+
+# A netuid's sentiment lock outlives analyze_sentiment with every retry, so a
+# slow refresh can't lose it and have a second worker analyze the same netuid
+SENTIMENT_LOCK_TTL = (
+    (celery_app.conf.task_max_retries + 1) * celery_app.conf.task_time_limit
+    + celery_app.conf.task_max_retries * celery_app.conf.task_default_retry_delay
+)
+
+
+async def _blocking(fn, *args, **kwargs):
+    """Run a blocking call (sync Redis, snapshot publish) in a thread, off the shared worker loop.
+
+    Every task's coroutines share one loop, so a Redis round trip made on it
+    would stall all of them, including the LLM deadlines.
+    """
+    return await asyncio.get_running_loop().run_in_executor(None, partial(fn, *args, **kwargs))
+
+
+async def _get_wallet():
+    """The worker's wallet, built off the loop: the first call imports bittensor and reads key files."""
+    return await _blocking(get_wallet)
+
+
+async def close_clients():
+    """Close every client this process opened; runs on the worker event loop at shutdown."""
+    for getter in (get_substrate_pool, get_llm_client, get_datura_client, get_wallet):
+        if getter.cache_info().currsize:
+            try:
+                await getter().close()
+            except Exception as e:
+                logger.error(f"Error closing {getter.__name__[4:]} - Error: {str(e)}")
+            getter.cache_clear()
+
+
+@worker_process_init.connect
+def start_worker_loop(**kwargs):
+    """Give each forked pool process its own event loop before it takes a task."""
+    worker_loop.start()
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def stop_worker_loop(**kwargs):
+    worker_loop.stop(close_clients)
+
+
+@worker_init.connect
+def start_metrics_exporter(**kwargs):
+    """Expose worker metrics; prefork children are merged when PROMETHEUS_MULTIPROCESS_DIR is set."""
+    try:
+        start_exporter(WORKER_METRICS_PORT)
+    except OSError as e:
+        logger.error(f"Failed to start metrics exporter on port {WORKER_METRICS_PORT} - Error: {str(e)}")
+
+
+@worker_process_shutdown.connect
+def release_process_metrics(pid=None, **kwargs):
+    mark_process_dead(pid or os.getpid())
 
 async def _update():
+    start_time = datetime.now()
     try:
-        redis_client.set(get_update_status_key(), "in_progress", ex=CACHE_TTL)
-        start_time = datetime.now()
-        redis_client.set(get_update_start_time_key(), start_time.isoformat(), ex=CACHE_TTL)
+        await _blocking(redis_client.set, get_update_status_key(), "in_progress", ex=CACHE_TTL)
+        await _blocking(redis_client.set, get_update_start_time_key(), start_time.isoformat(), ex=CACHE_TTL)
         logger.info("Starting cache update")
 
-        processed_count = 0
-        async with AsyncSubstrateInterface("wss://entrypoint-finney.opentensor.ai:443",
-                                       ss58_format=SS58_FORMAT) as substrate:
+        async with get_substrate_pool().connection() as substrate:
             block_hash = await substrate.get_chain_head()
-            tasks = [
-                (netuid, substrate.query_map(
-                    "SubtensorModule",
-                    "TaoDividendsPerSubnet",
-                    [netuid],
-                    block_hash=block_hash
-                )) for netuid in range(1, 51)
-            ]
-            results_dicts_list = []
-            
-            for netuid, task in tasks:
-                result = await exhaust(task)
-                results_dicts_list.extend([(netuid, decode_account_id(k), v.value) for k, v in result])
+            fetch_start = datetime.now()
+            results_dicts_list = await fetch_subnet_dividends(substrate, block_hash)
+            logger.info(f"Fetched {len(results_dicts_list)} dividends in {(datetime.now() - fetch_start).total_seconds():.2f} seconds")
                 
-            redis_client.set(get_block_hash_cache_key(), block_hash, ex=CACHE_TTL)
+            # Publish the changed subnets, then flip readers onto the new snapshot
+            stats = await _blocking(publish_snapshot, redis_client, block_hash, results_dicts_list)
+            await _blocking(redis_client.set, get_update_progress_key(), json.dumps(stats), ex=CACHE_TTL)
+            processed_count = stats["rows"]
+            UPDATE_ROWS.set(processed_count)
+            UPDATE_ROWS_WRITTEN.inc(stats["rows_written"])
             logger.info(f"Cached block hash: {block_hash}")
-            
-            # Process and cache results
-            for netuid, hotkey, value in results_dicts_list:
-                try:
-                    cache_key = get_dividend_cache_key(netuid, hotkey)
-                    redis_client.set(cache_key, json.dumps(value), ex=CACHE_TTL)
-                    logger.info(f"Cached: netuid={netuid}, hotkey={hotkey}")
-                    processed_count += 1
-                    
-                    if processed_count % 1000 == 0:
-                        print(f"Cache Key -- {cache_key}")
-                        logger.info(f"Processed {processed_count} records")
-                except Exception as e:
-                    logger.error(f"Error processing hotkey {hotkey}: {e}")
-                    continue
 
         end_time = datetime.now()
         duration = (end_time - start_time).total_seconds()
+        UPDATE_DURATION.labels("success").observe(duration)
         logger.info(f"Cache update completed in {duration:.2f} seconds")
         logger.info(f"Total records processed: {processed_count}")
         
-        redis_client.set(get_update_status_key(), "completed", ex=CACHE_TTL)
+        await _blocking(redis_client.set, get_update_status_key(), "completed", ex=CACHE_TTL)
         return processed_count
 
     except Exception as e:
         logger.error(f"Error in _update function: {e}")
-        redis_client.set(get_update_status_key(), "failed", ex=CACHE_TTL)
+        UPDATE_DURATION.labels("failed").observe((datetime.now() - start_time).total_seconds())
+        await _blocking(redis_client.set, get_update_status_key(), "failed", ex=CACHE_TTL)
         raise
 
 @celery_app.task(bind=True, max_retries=3)
@@ -134,14 +208,9 @@ def update_dividends_cache(self):
             return "Update already in progress"
 
         logger.info("Starting periodic cache update")
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            processed_count = loop.run_until_complete(_update())
-            logger.info(f"Completed periodic cache update with {processed_count} records")
-            return processed_count
-        finally:
-            loop.close()
+        processed_count = run_async(_update(), timeout=TASK_TIMEOUT)
+        logger.info(f"Completed periodic cache update with {processed_count} records")
+        return processed_count
     except Exception as e:
         logger.error(f"Error in periodic update_dividends_cache task: {e}")
         try:
@@ -152,8 +221,276 @@ def update_dividends_cache(self):
 
 
 
+def is_sentiment_fresh(result: Optional[dict], now: Optional[float] = None) -> bool:
+    """Whether a cached sentiment result is recent enough to serve without a refresh."""
+    if not result or "updated_at" not in result:
+        return False
+    return (now or time.time()) - result["updated_at"] < SENTIMENT_STALE_AFTER
+
+
+def _acquire_sentiment_locks(netuids: List[int]) -> List[int]:
+    """Take the in-flight lock of each netuid that doesn't already have an analysis queued or running."""
+    pipe = redis_client.pipeline(transaction=False)
+    for netuid in netuids:
+        pipe.set(get_sentiment_lock_key(netuid), "1", nx=True, ex=SENTIMENT_LOCK_TTL)
+    acquired = [netuid for netuid, locked in zip(netuids, pipe.execute()) if locked]
+
+    pipe = redis_client.pipeline(transaction=False)
+    if acquired:
+        pipe.hincrby(get_sentiment_refresh_stats_key(), "enqueued", len(acquired))
+    if len(acquired) < len(netuids):
+        pipe.hincrby(get_sentiment_refresh_stats_key(), "suppressed_in_flight", len(netuids) - len(acquired))
+    pipe.execute()
+    return acquired
+
+
+def request_sentiment_refresh(netuid: int) -> bool:
+    """Enqueue `analyze_sentiment` unless one is already in flight for `netuid`.
+
+    Returns True if a job was enqueued.
+    """
+    if not _acquire_sentiment_locks([netuid]):
+        return False
+    analyze_sentiment.delay(netuid=netuid)
+    return True
+
+
+def _store_sentiment(netuid: int, result: dict):
+    """Cache a finished analysis and release the netuid's in-flight lock."""
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.set(get_sentiment_cache_key(netuid), json.dumps(dict(result, updated_at=time.time())), ex=CACHE_TTL)
+    pipe.delete(get_sentiment_lock_key(netuid))
+    pipe.execute()
+
+
+@celery_app.task
+def refresh_stale_sentiments() -> Dict[str, int]:
+    """Refresh the sentiment of every recently requested netuid whose score has gone stale."""
+    now = time.time()
+    demand_key = get_sentiment_demand_key()
+    redis_client.zremrangebyscore(demand_key, 0, now - SENTIMENT_DEMAND_WINDOW)
+    netuids = [int(netuid) for netuid in redis_client.zrange(demand_key, 0, -1)]
+    if not netuids:
+        return {"netuids": 0, "stale": 0, "enqueued": 0}
+
+    cached = redis_client.mget([get_sentiment_cache_key(netuid) for netuid in netuids])
+    stale = [netuid for netuid, raw in zip(netuids, cached) if not is_sentiment_fresh(json.loads(raw) if raw else None, now)]
+    acquired = _acquire_sentiment_locks(stale)
+    if acquired:
+        # One job scores every stale subnet, SENTIMENT_BATCH_SIZE subnets per LLM request
+        analyze_sentiment_batch.delay(netuids=acquired)
+    logger.info(f"Sentiment refresh sweep - Netuids: {len(netuids)}, Stale: {len(stale)}, Enqueued: {len(acquired)}")
+    return {"netuids": len(netuids), "stale": len(stale), "enqueued": len(acquired)}
+
+
+def _tweet_key(tweet: dict) -> str:
+    """Stable identity of a tweet: its ID, or a hash of its text when the search result has none."""
+    if tweet.get("id"):
+        return f"id:{tweet['id']}"
+    return f"xxh:{xxhash.xxh3_64(tweet['text'].encode('utf-8')).hexdigest()}"
+
+
+def _tweets(tweets_result) -> Dict[str, str]:
+    """Tweet key -> text for the usable tweets of a search result."""
+    return {_tweet_key(result): result.get("text") for result in tweets_result or [] if "text" in result.keys()}
+
+
+async def _score_single(llm: LLMClient, tweet: str) -> float:
+    return float(await llm.query_chute_llm(tweet))
+
+
+async def _score_chunk(llm: LLMClient, chunk: Dict[str, str]) -> Dict[str, float]:
+    """Score a chunk of tweets in one LLM request, falling back to one request per tweet it didn't score."""
+    keys = list(chunk)
+    scores: Dict[str, float] = {}
+    if len(keys) > 1:
+        try:
+            by_index = await llm.score_tweets([chunk[key] for key in keys])
+            scores = {keys[index]: score for index, score in by_index.items()}
+        except Exception as e:
+            logger.warning(f"Batch sentiment scoring failed for {len(keys)} tweets, scoring individually - Error: {str(e)}")
+
+    missing = [key for key in keys if key not in scores]
+    if missing and len(keys) > 1:
+        logger.info(f"Scoring {len(missing)} of {len(keys)} tweets individually")
+    fallback = await asyncio.gather(*(_score_single(llm, chunk[key]) for key in missing), return_exceptions=True)
+    for key, score in zip(missing, fallback):
+        if isinstance(score, Exception):
+            logger.error(f"Sentiment scoring failed for tweet {key} - Error: {str(score)}")
+        else:
+            scores[key] = score
+    return scores
+
+
+async def _score_chunk_by_deadline(llm: LLMClient, chunk: Dict[str, str], deadline: float) -> Dict[str, float]:
+    try:
+        return await asyncio.wait_for(_score_chunk(llm, chunk), timeout=deadline)
+    except asyncio.TimeoutError:
+        logger.warning(f"LLM missed the {deadline:.1f}s deadline for {len(chunk)} tweets, using lexicon scores")
+        return {}
+
+
+def _cache_tweet_scores(scored: Dict[str, Tuple[float, str]], cached_count: int):
+    pipe = redis_client.pipeline(transaction=False)
+    for key, (score, scorer) in scored.items():
+        ttl = TWEET_SCORE_TTL if scorer == "llm" else LEXICON_SCORE_TTL
+        pipe.set(get_tweet_sentiment_key(key), json.dumps([score, scorer]), ex=ttl)
+    pipe.hincrby(get_sentiment_refresh_stats_key(), "tweets_cached", cached_count)
+    pipe.hincrby(get_sentiment_refresh_stats_key(), "tweets_scored_llm", sum(scorer == "llm" for _, scorer in scored.values()))
+    pipe.hincrby(get_sentiment_refresh_stats_key(), "tweets_scored_lexicon", sum(scorer == "lexicon" for _, scorer in scored.values()))
+    pipe.execute()
+
+
+def _scorer_tag(scorers: List[str]) -> str:
+    """Which scorer produced a subnet score: "llm", "lexicon", or "mixed" when its tweets disagree."""
+    return scorers[0] if len(set(scorers)) == 1 else "mixed"
+
+
+async def score_sentiments(tweets_by_netuid: Dict[int, Dict[str, str]],
+                           batch_size: int = SENTIMENT_BATCH_SIZE,
+                           deadline: float = SENTIMENT_LLM_DEADLINE) -> Dict[int, Tuple[float, str]]:
+    """Score many subnets as the mean of their tweets' scores, tagged with the scorer that produced them.
+
+    Tweet scores are cached under the tweet's key, so only tweets never seen
+    before go to the LLM, packed up to `batch_size` per request. Those the LLM
+    doesn't score within `deadline` seconds get the local lexicon score, cached
+    for only LEXICON_SCORE_TTL so a later refresh asks the LLM again.
+    """
+    unique: Dict[str, str] = {}
+    for tweets in tweets_by_netuid.values():
+        unique.update(tweets)
+    keys = list(unique)
+    cached = await _blocking(redis_client.mget, [get_tweet_sentiment_key(key) for key in keys]) if keys else []
+    tweet_scores = {key: tuple(json.loads(raw)) for key, raw in zip(keys, cached) if raw is not None}
+
+    unscored = [key for key in keys if key not in tweet_scores]
+    scored: Dict[str, Tuple[float, str]] = {}
+    if unscored:
+        # The local scores cost milliseconds, so they are ready before the LLM is asked
+        lexicon_scores = get_lexicon_scorer().score([unique[key] for key in unscored]).tolist()
+        llm = get_llm_client()
+        chunks = [{key: unique[key] for key in unscored[i:i + batch_size]} for i in range(0, len(unscored), max(batch_size, 1))]
+        llm_scores: Dict[str, float] = {}
+        for chunk_scores in await asyncio.gather(*(_score_chunk_by_deadline(llm, chunk, deadline) for chunk in chunks)):
+            llm_scores.update(chunk_scores)
+        for key, lexicon_score in zip(unscored, lexicon_scores):
+            scored[key] = (llm_scores[key], "llm") if key in llm_scores else (lexicon_score, "lexicon")
+        logger.info(f"Scored {len(unscored)} new tweets with {len(chunks)} batched LLM requests - "
+                    f"LLM: {len(llm_scores)}, Lexicon: {len(unscored) - len(llm_scores)}")
+
+    await _blocking(_cache_tweet_scores, scored, len(tweet_scores))
+    tweet_scores.update(scored)
+
+    scores: Dict[int, Tuple[float, str]] = {}
+    for netuid, tweets in tweets_by_netuid.items():
+        values = [tweet_scores[key] for key in tweets if key in tweet_scores]
+        if values:
+            scores[netuid] = (
+                sum(score for score, _ in values) / len(values),
+                _scorer_tag([scorer for _, scorer in values])
+            )
+    return scores
+
+
+async def _analyze_sentiment_batch(netuids: List[int]) -> Dict[int, dict]:
+    results: Dict[int, dict] = {}
+    try:
+        searched = await get_datura_client().search_tweets_many(netuids)
+        tweets_by_netuid = {netuid: _tweets(searched.get(netuid)) for netuid in netuids}
+        tweets_by_netuid = {netuid: tweets for netuid, tweets in tweets_by_netuid.items() if tweets}
+
+        scores = await score_sentiments(tweets_by_netuid)
+        for netuid, (score, scorer) in scores.items():
+            if score:
+                wallet = await _get_wallet()
+                await _blocking(execute_sentiment_trade, netuid=netuid, hotkey=wallet.hotkey, sentiment_score=score)
+            results[netuid] = {
+                "success": True,
+                "sentiment_score": str(score),
+                "scorer": scorer,
+                "tweets_analyzed": len(tweets_by_netuid[netuid]),
+                "error": None,
+                "cached": False
+            }
+            await _blocking(_store_sentiment, netuid, results[netuid])
+        return results
+    finally:
+        # Subnets without tweets or a score keep their old result and can be retried right away
+        unscored = [netuid for netuid in netuids if netuid not in results]
+        if unscored:
+            await _blocking(redis_client.delete, *[get_sentiment_lock_key(netuid) for netuid in unscored])
+
+
+@celery_app.task
+def analyze_sentiment_batch(netuids: List[int]) -> Dict[str, int]:
+    """Analyze sentiment for many netuids: concurrent tweet search, then batched LLM scoring."""
+    results = run_async(_analyze_sentiment_batch(netuids), timeout=TASK_TIMEOUT)
+    return {"netuids": len(netuids), "scored": len(results)}
+
+
+async def _analyze_sentiment(netuid: int) -> dict[str, any]:
+    logger.info(f"Starting sentiment analysis for netuid {netuid}")
+    
+    # Search for tweets
+    tweets_result = await get_datura_client().search_tweets(str(netuid))
+    if not tweets_result:
+        logger.warning(f"No tweets found for netuid {netuid}")
+        await _blocking(redis_client.delete, get_sentiment_lock_key(netuid))
+        return {
+            "success": False,
+            "error": "No tweets found",
+            "sentiment_score": "",
+            "tweets_analyzed": 0
+        }
+    
+    # Extract tweet texts
+    tweets = _tweets(tweets_result)
+    if not tweets:
+        logger.warning(f"No valid tweets found for netuid {netuid}")
+        await _blocking(redis_client.delete, get_sentiment_lock_key(netuid))
+        return {
+            "success": False,
+            "error": "No valid tweets found",
+            "sentiment_score": "",
+            "tweets_analyzed": 0
+        }
+    
+    logger.info(f"Found {len(tweets)} tweets for analysis")
+    
+    # Get sentiment analysis; previously scored tweets come from cache
+    scores = await score_sentiments({netuid: tweets})
+    sentiment_score, scorer = scores[netuid]
+    sentiment_result = str(sentiment_score)
+    
+    logger.info(f"Sentiment analysis complete - Score: {sentiment_score:.2f}, Scorer: {scorer}")
+    
+    if sentiment_score:
+        logger.info(f"Executing trade based on sentiment score: {sentiment_score:.2f}")
+        await _blocking(
+            execute_sentiment_trade,
+            netuid=netuid,
+            hotkey=(await _get_wallet()).hotkey,
+            sentiment_score=sentiment_score,
+        )
+    
+    result = {
+        "success": True,
+        "sentiment_score": sentiment_result,
+        "scorer": scorer,
+        "tweets_analyzed": len(tweets),
+        "error": None,
+        "cached": False
+    }
+    
+    # Cache the result
+    await _blocking(_store_sentiment, netuid, result)
+    logger.info(f"Cached sentiment result for netuid {netuid}")
+    
+    return result
+
+
 @celery_app.task(bind=True, max_retries=3)
-async def analyze_sentiment(self, netuid: int) -> dict[str, any]:
+def analyze_sentiment(self, netuid: int) -> dict[str, any]:
     """
     Analyze sentiment for a given netuid by searching for tweets and calculating a sentiment score.
     Results are cached in Redis for CACHE_TTL seconds.
@@ -170,77 +507,11 @@ async def analyze_sentiment(self, netuid: int) -> dict[str, any]:
             - cached (bool): Whether the result was retrieved from cache
     """
     try:
-        logger.info(f"Starting sentiment analysis for netuid {netuid}")
-        
-        # Search for tweets
-        tweets_result = await datura_client.search_tweets(str(netuid))
-        if not tweets_result:
-            logger.warning(f"No tweets found for netuid {netuid}")
-            return {
-                "success": False,
-                "error": "No tweets found",
-                "sentiment_score": "",
-                "tweets_analyzed": 0
-            }
-        
-        # Extract tweet texts
-        tweets = [result.get("text") for result in tweets_result if "text" in result.keys()]
-        if not tweets:
-            logger.warning(f"No valid tweets found for netuid {netuid}")
-            return {
-                "success": False,
-                "error": "No valid tweets found",
-                "sentiment_score": "",
-                "tweets_analyzed": 0
-            }
-        
-        logger.info(f"Found {len(tweets)} tweets for analysis")
-        
-        # Combine tweets for analysis
-        combined_tweets = "\n".join(tweets) 
-        
-        # Create sentiment prompt
-        SENTIMENT_PROMPT = f"""Analyze the sentiment expressed in the following tweets and provide a single sentiment score ranging from -100 (very negative) to +100 (very positive), representing the overall sentiment of the provided tweets. Consider the nuances in language, opinions, and emotions expressed in the text.
-        
-        **Tweets:**
-        {combined_tweets}
-        
-        Just return the overall sentiment score without any explanatory text
-        """
-        
-        # Get sentiment analysis
-        sentiment_result = await llm_client.query_chute_llm(SENTIMENT_PROMPT)
-        sentiment_score = float(sentiment_result)
-        
-        logger.info(f"Sentiment analysis complete - Score: {sentiment_score:.2f}")
-        
-        if sentiment_score:
-            logger.info(f"Executing trade based on sentiment score: {sentiment_score:.2f}")
-            await execute_sentiment_trade(
-                netuid=netuid,
-                hotkey=wallet.hotkey,
-                sentiment_score=sentiment_score,
-            )
-        
-        result = {
-            "success": True,
-            "sentiment_score": sentiment_result,
-            "tweets_analyzed": len(tweets),
-            "error": None,
-            "cached": False
-        }
-        
-        # Cache the result
-        cache_key = get_sentiment_cache_key(netuid)
-        redis_client.set(cache_key, json.dumps(result), ex=CACHE_TTL)
-        logger.info(f"Cached sentiment result for netuid {netuid}")
-        
-        return result
-        
+        return run_async(_analyze_sentiment(netuid), timeout=TASK_TIMEOUT)
     except Exception as e:
         logger.error(f"Sentiment analysis failed for netuid {netuid} - Error: {str(e)}")
         try:
-            self.retry(exc=e, countdown=60)
+            self.retry(exc=e, countdown=celery_app.conf.task_default_retry_delay)
         except MaxRetriesExceededError:
             result = {
                 "success": False,
@@ -248,16 +519,19 @@ async def analyze_sentiment(self, netuid: int) -> dict[str, any]:
                 "sentiment_score": "",
                 "tweets_analyzed": 0
             }
-            cache_key = get_sentiment_cache_key(netuid)
-            redis_client.set(cache_key, json.dumps(result), ex=CACHE_TTL)
+            _store_sentiment(netuid, result)
             return result
 
 
-@celery_app.task(bind=True, max_retries=3)
-async def execute_sentiment_trade(netuid: int, hotkey: str, sentiment_score: float) -> Dict[str, Any]:
+@celery_app.task(max_retries=3)
+def execute_sentiment_trade(netuid: int, hotkey: str, sentiment_score: float) -> Dict[str, Any]:
     """
-    Execute a trade based on the sentiment score.
+    Queue a trade based on the sentiment score.
     Stakes or unstakes TAO proportional to the sentiment score (-100 to +100).
+
+    The trade is recorded as an intent and netted with every other intent for the
+    same (netuid, hotkey) until the next `flush_trade_intents` run, which submits
+    the net amounts as batch extrinsics.
     
     Args:
         netuid (int): The netuid to trade for
@@ -266,9 +540,9 @@ async def execute_sentiment_trade(netuid: int, hotkey: str, sentiment_score: flo
         
     Returns:
         Dict[str, Any]: A dictionary containing:
-            - success (bool): Whether the trade was successful
-            - action (str): The action taken (stake/unstake)
-            - amount (float): The amount traded
+            - success (bool): Whether the intent was queued
+            - action (str): The action queued (stake/unstake)
+            - amount (float): The amount queued
             - error (str): Error message if any
     """
     try:
@@ -282,15 +556,11 @@ async def execute_sentiment_trade(netuid: int, hotkey: str, sentiment_score: flo
         logger.info(f"Preparing trade - Netuid: {netuid}, Hotkey: {hotkey}, Sentiment: {sentiment_score:.2f}, Amount: {amount:.4f} TAO")
         
         if sentiment_score > 0:
-            # Stake TAO
-            logger.info(f"Staking {amount:.4f} TAO to netuid {netuid} for hotkey {hotkey}")
-            result = await wallet.add_stake(netuid=netuid, hotkey=hotkey, amount=float(amount))
             action = "stake"
+            signed_amount = amount
         elif sentiment_score < 0:
-            # Unstake TAO
-            logger.info(f"Unstaking {amount:.4f} TAO from netuid {netuid} for hotkey {hotkey}")
-            result = await wallet.unstake(netuid=netuid, hotkey=hotkey, amount=float(amount))
             action = "unstake"
+            signed_amount = -amount
         else:
             logger.info("No action needed - sentiment score is neutral")
             return {
@@ -299,17 +569,19 @@ async def execute_sentiment_trade(netuid: int, hotkey: str, sentiment_score: flo
                 "amount": 0.0,
                 "error": None
             }
-            
-        if result.get("success", False):
-            logger.info(f"Trade successful - Action: {action}, Amount: {amount:.4f} TAO")
-        else:
-            logger.error(f"Trade failed - Action: {action}, Error: {result.get('error', 'Unknown error')}")
+
+        field = f"{netuid}:{hotkey}"
+        pipe = redis_client.pipeline(transaction=True)
+        pipe.hincrbyfloat(get_trade_intents_key(), field, signed_amount)
+        pipe.hincrby(get_trade_intent_counts_key(), field, 1)
+        pipe.execute()
+        logger.info(f"Trade queued for netting - Action: {action}, Amount: {amount:.4f} TAO")
         
         return {
-            "success": result.get("success", False),
+            "success": True,
             "action": action,
             "amount": amount,
-            "error": result.get("error", "")
+            "error": ""
         }
         
     except Exception as e:
@@ -322,5 +594,86 @@ async def execute_sentiment_trade(netuid: int, hotkey: str, sentiment_score: flo
         }
 
 
+def _requeue_trades(trades):
+    """Put the net amounts of a failed submission back for the next flush."""
+    pipe = redis_client.pipeline(transaction=True)
+    for netuid, hotkey, signed_amount in trades:
+        pipe.hincrbyfloat(get_trade_intents_key(), f"{netuid}:{hotkey}", signed_amount)
+        pipe.hincrby(get_trade_intent_counts_key(), f"{netuid}:{hotkey}", 1)
+    pipe.execute()
+
+
+def _take_trade_intents():
+    """Take every pending intent atomically; new intents start a fresh window."""
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.hgetall(get_trade_intents_key())
+    pipe.hgetall(get_trade_intent_counts_key())
+    pipe.delete(get_trade_intents_key(), get_trade_intent_counts_key())
+    amounts, counts, _ = pipe.execute()
+    return amounts, counts
+
+
+async def _flush_trades() -> Dict[str, int]:
+    amounts, counts = await _blocking(_take_trade_intents)
+
+    intents = sum(int(count) for count in counts.values())
+    stakes, unstakes = [], []
+    for field, amount in amounts.items():
+        netuid, hotkey = field.decode().split(":", 1)
+        amount = round(float(amount), 9)  # TAO has 9 decimals
+        if amount > 0:
+            stakes.append((int(netuid), hotkey, amount))
+        elif amount < 0:
+            unstakes.append((int(netuid), hotkey, -amount))
+
+    stats = {
+        "intents": intents,
+        "pairs": len(amounts),
+        "stakes": len(stakes),
+        "unstakes": len(unstakes),
+        "netted": intents - len(stakes) - len(unstakes),
+        "extrinsics": 0,
+        "failed": 0,
+        "uncertain": 0,
+    }
+
+    for trades, submit, sign in ((stakes, "add_stake_multiple", 1), (unstakes, "unstake_multiple", -1)):
+        if not trades:
+            continue
+        try:
+            result = await getattr(await _get_wallet(), submit)(trades)
+        except Exception as e:
+            result = {"success": False, "error": str(e), "extrinsics": 0}
+        stats["extrinsics"] += result.get("extrinsics", 0)
+        if result.get("success", False):
+            continue
+        if result.get("uncertain", False):
+            # Sent but unconfirmed: requeueing could submit the same stakes twice
+            stats["uncertain"] += len(trades)
+            logger.error(f"Trade batch outcome unknown, not requeued - Trades: {trades}, Error: {result.get('error')}")
+        else:
+            # batch_all is atomic, so a failed batch applied none of its trades
+            stats["failed"] += len(trades)
+            await _blocking(_requeue_trades, [(netuid, hotkey, sign * amount) for netuid, hotkey, amount in trades])
+            logger.error(f"Trade batch failed, requeued {len(trades)} trades - Error: {result.get('error', 'Unknown error')}")
+
+    await _blocking(redis_client.set, get_trade_flush_stats_key(), json.dumps(stats), ex=CACHE_TTL)
+    logger.info(
+        f"Flushed trade intents - Intents: {stats['intents']}, Netted: {stats['netted']}, "
+        f"Stakes/Unstakes: {stats['stakes']}/{stats['unstakes']}, Extrinsics: {stats['extrinsics']}, Uncertain: {stats['uncertain']}"
+    )
+    return stats
+
+
+@celery_app.task(bind=True, max_retries=3)
+def flush_trade_intents(self):
+    """Net queued trade intents per (netuid, hotkey) and submit them as batch extrinsics."""
+    try:
+        return run_async(_flush_trades(), timeout=TASK_TIMEOUT)
+    except Exception as e:
+        logger.error(f"Error in flush_trade_intents task: {e}")
+        raise
+
+
 if __name__ == '__main__':
     celery_app.start()
@@ -74,7 +74,7 @@ def mock_substrate():
 
 @pytest.fixture
 def mock_decode_account_id():
-    with patch('app.main.decode_account_id') as mock_decode:
+    with patch('bittensor.core.chain_data.decode_account_id') as mock_decode:
         def decode_fn(key):
             if key == b"5GrwvaEF5zXb26Fz9rcQpDWS57CtERHpNehXCPcNoHGKutQY":
                 return "test_hotkey"
@@ -104,9 +104,10 @@ def mock_bittensor_wallet():
 
 @pytest.fixture
 def mock_async_subtensor():
+    from bittensor.utils.balance import Balance
     with patch('bittensor.AsyncSubtensor') as mock_subtensor:
         instance = AsyncMock()
-        instance.get_balance.return_value = 100.0
+        instance.get_balance.return_value = Balance.from_tao(100.0)
         instance.get_dividends_for_hotkey.return_value = 10.0
         instance.add_stake.return_value = {"success": True}
         instance.unstake.return_value = {"success": True}
@@ -0,0 +1,77 @@
+import json
+import os
+import threading
+
+import pytest
+from datetime import timedelta
+from fastapi import HTTPException
+
+from app import utils
+from app.cache import L1Cache
+from app.utils import UserStore, authenticate_user, create_access_token, get_current_user, get_password_hash
+
+
+def _write_users(path, users, mtime):
+    path.write_text(json.dumps(users))
+    os.utime(path, (mtime, mtime))
+
+
+def test_user_store_reloads_only_when_file_changes(tmp_path, monkeypatch):
+    path = tmp_path / "users.json"
+    _write_users(path, {"alice": {"username": "alice"}}, mtime=1000)
+    loads = []
+    real_load = utils.load_fake_users_db
+    monkeypatch.setattr(utils, "load_fake_users_db", lambda p: loads.append(p) or real_load(p))
+
+    store = UserStore(str(path))
+    assert store.get("alice") == {"username": "alice"}
+    assert store.get("bob") is None
+    assert len(loads) == 1
+
+    _write_users(path, {"bob": {"username": "bob"}}, mtime=2000)
+    assert store.get("bob") == {"username": "bob"}
+    assert store.get("alice") is None
+    assert len(loads) == 2
+
+
+@pytest.mark.asyncio
+async def test_authenticate_user_verifies_password_off_the_event_loop(tmp_path, monkeypatch):
+    path = tmp_path / "users.json"
+    _write_users(path, {"alice": {"username": "alice", "hashed_password": get_password_hash("secret")}}, mtime=1000)
+    monkeypatch.setattr(utils, "fake_users_db", UserStore(str(path)))
+
+    threads = []
+    real_verify = utils.verify_password
+
+    def verify(plain, hashed):
+        threads.append(threading.current_thread().name)
+        return real_verify(plain, hashed)
+
+    monkeypatch.setattr(utils, "verify_password", verify)
+
+    assert (await authenticate_user("alice", "secret"))["username"] == "alice"
+    assert await authenticate_user("alice", "wrong") is None
+    assert await authenticate_user("mallory", "secret") is None
+    assert all(name.startswith("password-verify") for name in threads) and len(threads) == 2
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_caches_verified_tokens(monkeypatch):
+    monkeypatch.setattr(utils, "token_cache", L1Cache(maxsize=10, ttl=60, enabled=True))
+    decodes = []
+    real_decode = utils.jwt.decode
+    monkeypatch.setattr(utils.jwt, "decode", lambda *args, **kwargs: decodes.append(args) or real_decode(*args, **kwargs))
+    token = create_access_token({"sub": "alice"}, expires_delta=timedelta(minutes=5))
+
+    for _ in range(3):
+        assert await get_current_user(token) == {"username": "alice"}
+
+    assert len(decodes) == 1
+    stats = utils.token_cache.stats()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+
+    # Expired and invalid tokens are rejected and never cached
+    for bad_token in (create_access_token({"sub": "alice"}, expires_delta=timedelta(seconds=-1)), "not-a-jwt"):
+        with pytest.raises(HTTPException):
+            await get_current_user(bad_token)
+    assert utils.token_cache.stats()["size"] == 1
@@ -0,0 +1,173 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+import redis
+import redis.asyncio as aioredis
+
+from app import cache
+from app.cache import (
+    L1Cache, watch_snapshot_updates, publish_snapshot, get_current_snapshot, read_dividend, read_all_dividends,
+    read_hotkey_dividends, iter_snapshot_dividends
+)
+from app.config import (
+    REDIS_HOST, REDIS_PORT, get_dividend_cache_key, get_hotkey_index_cache_key, get_snapshot_channel
+)
+
+
+@pytest.mark.asyncio
+async def test_read_hotkey_dividends_single_lookup():
+    client = MagicMock()
+    client.hget = AsyncMock()
+    client.hget.return_value = json.dumps({"dividends": {"3": 5, "2": 7}, "total": 12}).encode()
+
+    snapshot = {"block_hash": "0xabc", "subnets": {2: "f2", 3: "f3"}, "hotkeys": "fh"}
+
+    result = await read_hotkey_dividends(client, snapshot, "hotkey_a")
+
+    assert result == {"dividends": [(2, 7), (3, 5)], "total": 12}
+    client.hget.assert_called_once_with(get_hotkey_index_cache_key("fh"), "hotkey_a")
+    client.keys.assert_not_called()
+
+
+async def _scan(items):
+    for item in items:
+        yield item
+
+
+@pytest.mark.asyncio
+async def test_iter_snapshot_dividends_streams_subnet_by_subnet():
+    client = MagicMock()
+    client.hscan_iter.side_effect = lambda key, count: _scan(
+        [(b"hotkey_a", b"1")] if key == get_dividend_cache_key(1, "f1") else [(b"hotkey_b", b"2")]
+    )
+    snapshot = {"block_hash": "0xabc", "subnets": {1: "f1", 2: "f2"}, "hotkeys": "fh"}
+
+    rows = iter_snapshot_dividends(client, snapshot, netuids=[1, 2, 3])
+
+    assert await rows.__anext__() == (1, "hotkey_a", 1)
+    assert client.hscan_iter.call_count == 1
+    assert [row async for row in rows] == [(2, "hotkey_b", 2)]
+
+
+@pytest.fixture
+def redis_db(monkeypatch):
+    """Scratch Redis database, isolated from the app's cache."""
+    monkeypatch.setattr(cache, "_published_subnets", {})
+    client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=15)
+    client.flushdb()
+    yield client
+    client.flushdb()
+
+
+@pytest.mark.asyncio
+async def test_publish_snapshot_only_writes_changed_rows(redis_db):
+    # The worker publishes with the sync client; the API reads with the asyncio one
+    async_redis_db = aioredis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=15)
+    first = [(1, "hotkey_a", 10), (1, "hotkey_b", 20), (2, "hotkey_a", 5)]
+    stats = publish_snapshot(redis_db, "0x1", first)
+    assert stats["rows_written"] == 3
+
+    # hotkey_b changes, hotkey_c joins subnet 1; subnet 2 is untouched
+    second = [(1, "hotkey_a", 10), (1, "hotkey_b", 25), (1, "hotkey_c", 1), (2, "hotkey_a", 5)]
+    stats = publish_snapshot(redis_db, "0x2", second)
+
+    assert stats["subnets_skipped"] == 1
+    assert stats["subnets_written"] == 1
+    assert stats["rows_written"] == 2
+    assert stats["rows_skipped"] == 2
+    assert stats["rows_deleted"] == 0
+
+    snapshot = await get_current_snapshot(async_redis_db)
+    assert snapshot["block_hash"] == "0x2"
+    assert sorted(await read_all_dividends(async_redis_db, snapshot)) == sorted(second)
+    assert await read_hotkey_dividends(async_redis_db, snapshot, "hotkey_a") == {"dividends": [(1, 10), (2, 5)], "total": 15}
+
+    # hotkey_a leaves subnet 1; the first snapshot's subnet 1 is past retention and is collected
+    third = [(1, "hotkey_b", 25), (1, "hotkey_c", 1), (2, "hotkey_a", 5)]
+    stats = publish_snapshot(redis_db, "0x3", third)
+
+    assert stats["rows_deleted"] == 1
+    snapshot = await get_current_snapshot(async_redis_db)
+    assert await read_dividend(async_redis_db, snapshot, 1, "hotkey_a") is None
+    assert await read_hotkey_dividends(async_redis_db, snapshot, "hotkey_a") == {"dividends": [(2, 5)], "total": 5}
+    first_subnet_1 = get_dividend_cache_key(1, cache.fingerprint_rows({"hotkey_a": "10", "hotkey_b": "20"}))
+    assert not redis_db.exists(first_subnet_1)
+    await async_redis_db.aclose()
+
+
+@pytest.mark.asyncio
+async def test_publish_snapshot_rewrites_evicted_previous_versions(redis_db):
+    async_redis_db = aioredis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=15)
+    first = [(1, "hotkey_a", 10), (1, "hotkey_b", 20), (2, "hotkey_a", 5)]
+    publish_snapshot(redis_db, "0x1", first)
+    snapshot = await get_current_snapshot(async_redis_db)
+    # Evicted under memory pressure; this process still remembers the rows
+    redis_db.delete(get_dividend_cache_key(1, snapshot["subnets"][1]), get_dividend_cache_key(2, snapshot["subnets"][2]),
+                    get_hotkey_index_cache_key(snapshot["hotkeys"]))
+
+    second = [(1, "hotkey_a", 10), (1, "hotkey_b", 25), (2, "hotkey_a", 5)]
+    stats = publish_snapshot(redis_db, "0x2", second)
+
+    assert stats["subnets_written"] == 2 and stats["rows_written"] == 3
+    snapshot = await get_current_snapshot(async_redis_db)
+    assert sorted(await read_all_dividends(async_redis_db, snapshot)) == sorted(second)
+    assert await read_hotkey_dividends(async_redis_db, snapshot, "hotkey_a") == {"dividends": [(1, 10), (2, 5)], "total": 15}
+    assert await read_hotkey_dividends(async_redis_db, snapshot, "hotkey_b") == {"dividends": [(1, 25)], "total": 25}
+    await async_redis_db.aclose()
+
+
+def test_l1_cache_evicts_least_recently_used_and_expired_entries():
+    now = [0.0]
+    l1 = L1Cache(maxsize=2, ttl=10, enabled=True, clock=lambda: now[0])
+    l1.set("a", 1)
+    l1.set("b", 2)
+    assert l1.get("a") == 1
+    l1.set("c", 3)  # evicts "b", the least recently used
+
+    assert l1.get("b") is None
+    assert l1.get("c") == 3
+    now[0] = 11
+    assert l1.get("a") is None
+    assert l1.stats()["hit_ratio"] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_hot_dividend_lookup_is_served_without_redis(monkeypatch):
+    monkeypatch.setattr(cache, "l1_cache", L1Cache(enabled=True))
+    client = MagicMock()
+    client.get = AsyncMock(return_value=json.dumps(
+        {"block_hash": "0xabc", "subnets": {"1": "f1"}, "hotkeys": "fh"}
+    ).encode())
+    client.hget = AsyncMock(return_value=b"42")
+
+    for _ in range(3):
+        snapshot = await get_current_snapshot(client)
+        assert await read_dividend(client, snapshot, 1, "hotkey_a") == 42
+
+    assert client.get.await_count == 1
+    assert client.hget.await_count == 1
+    assert cache.l1_cache.stats()["hits"] == 4
+
+
+@pytest.mark.asyncio
+async def test_publish_snapshot_invalidates_l1_cache(redis_db):
+    async_redis_db = aioredis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=15)
+    l1 = L1Cache(enabled=True)
+    watcher = asyncio.create_task(watch_snapshot_updates(async_redis_db, l1))
+    while not (await async_redis_db.pubsub_numsub(get_snapshot_channel()))[0][1]:
+        await asyncio.sleep(0.01)
+
+    l1.set("snapshot", {"block_hash": "0x0"})
+    publish_snapshot(redis_db, "0x1", [(1, "hotkey_a", 10)])
+    for _ in range(100):
+        if l1.get("snapshot") is None:
+            break
+        await asyncio.sleep(0.01)
+
+    assert l1.stats()["size"] == 0
+    watcher.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await watcher
+    await async_redis_db.aclose()
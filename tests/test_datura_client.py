@@ -0,0 +1,33 @@
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.clients import DaturaClient
+
+
+@pytest.mark.asyncio
+async def test_search_tweets_many_overlaps_blocking_searches():
+    datura = DaturaClient(max_workers=4)
+
+    def search(query, sort, lang, count):
+        time.sleep(0.2)
+        if query.endswith(" 3"):
+            raise ConnectionError("boom")
+        return [{"text": query}]
+
+    datura.client = MagicMock()
+    datura.client.basic_twitter_search.side_effect = search
+
+    start = time.perf_counter()
+    results = await datura.search_tweets_many([1, 2, 3, 4])
+    elapsed = time.perf_counter() - start
+    await datura.close()
+
+    assert results == {
+        1: [{"text": "Bittensor netuid 1"}],
+        2: [{"text": "Bittensor netuid 2"}],
+        3: [],
+        4: [{"text": "Bittensor netuid 4"}],
+    }
+    assert elapsed < 0.6
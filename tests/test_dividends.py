@@ -81,4 +81,24 @@ def test_invalid_login():
         "password": "invalid_password"
     }
     response = client.post("/api/v1/login", data=invalid_form_data)
-    assert response.status_code == 401 
\ No newline at end of file
+    assert response.status_code == 401 
+
+def test_hotkey_only_lookup_skips_subnet_sentiment(monkeypatch):
+    from unittest.mock import AsyncMock
+    from app.routes import dividends
+    from app.utils import get_current_user
+
+    monkeypatch.setattr(dividends, "get_current_snapshot", AsyncMock(return_value={"block_hash": "0xabc"}))
+    monkeypatch.setattr(dividends, "read_hotkey_dividends", AsyncMock(return_value={"dividends": [(2, 7), (3, 5)], "total": 12}))
+    redis_mock = MagicMock()
+    monkeypatch.setattr(dividends, "async_redis_client", redis_mock)
+    app.dependency_overrides[get_current_user] = lambda: {"username": TEST_USERNAME}
+    try:
+        response = client.get("/api/v1/tao-dividends", params={"hotkey": "hk"})
+    finally:
+        app.dependency_overrides.pop(get_current_user)
+
+    assert response.status_code == 200
+    assert response.json()["total_dividend"] == 12
+    assert [row["netuid"] for row in response.json()["data"]] == [2, 3]
+    redis_mock.pipeline.assert_not_called()
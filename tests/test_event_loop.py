@@ -0,0 +1,120 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from tasks import worker
+from tasks.event_loop import WorkerLoop
+
+
+@pytest.fixture
+def loop_runner():
+    runner = WorkerLoop()
+    yield runner
+    runner.stop()
+
+
+def test_tasks_share_one_loop_and_run_concurrently(loop_runner):
+    async def task():
+        await asyncio.sleep(0.2)
+        return asyncio.get_running_loop()
+
+    # Four task threads, as with `--pool threads --concurrency 4`
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        loops = list(pool.map(lambda _: loop_runner.run(task()), range(4)))
+
+    assert time.perf_counter() - start < 0.6
+    assert len(set(map(id, loops))) == 1
+    assert loop_runner.run(task()) is loops[0]
+
+
+def test_timed_out_task_is_cancelled(loop_runner):
+    cancelled = threading.Event()
+
+    async def hang():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(TimeoutError):
+        loop_runner.run(hang(), timeout=0.05)
+    assert cancelled.wait(1)
+
+
+def test_stop_closes_clients_on_the_loop(loop_runner, monkeypatch):
+    loop = loop_runner.start()
+    llm = AsyncMock()
+    monkeypatch.setattr(worker, "get_llm_client", lru_cache(maxsize=None)(lambda: llm))
+    worker.get_llm_client()
+
+    loop_runner.stop(worker.close_clients)
+
+    llm.close.assert_awaited_once()
+    assert worker.get_llm_client.cache_info().currsize == 0
+    assert loop.is_closed() and not loop_runner.running
+
+
+def test_worker_tasks_are_bounded_without_celery_time_limits(monkeypatch):
+    assert worker.TASK_TIMEOUT == worker.celery_app.conf.task_soft_time_limit
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(worker, "TASK_TIMEOUT", 0.05)
+    monkeypatch.setattr(worker, "_flush_trades", hang)
+    try:
+        with pytest.raises(TimeoutError):
+            worker.flush_trade_intents()
+    finally:
+        worker.worker_loop.stop()
+
+
+@pytest.mark.asyncio
+async def test_blocking_redis_calls_do_not_stall_the_shared_loop(monkeypatch):
+    def slow_take():
+        time.sleep(0.2)  # A large HGETALL, or a full snapshot publish
+        return {}, {}
+
+    monkeypatch.setattr(worker, "_take_trade_intents", slow_take)
+    monkeypatch.setattr(worker, "redis_client", MagicMock())
+    ticks = []
+
+    async def ticker():
+        while len(ticks) < 100:
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    ticking = asyncio.create_task(ticker())
+    stats = await worker._flush_trades()
+    ticking.cancel()
+
+    assert stats["intents"] == 0
+    assert len(ticks) >= 10
+
+
+@pytest.mark.asyncio
+async def test_wallet_is_built_off_the_shared_loop(monkeypatch):
+    built_on = []
+    wallet = MagicMock()
+    wallet.add_stake_multiple = AsyncMock(return_value={"success": True, "extrinsics": 1})
+
+    def build_wallet():
+        # Imports bittensor and reads key files on first use
+        built_on.append(threading.current_thread())
+        return wallet
+
+    monkeypatch.setattr(worker, "get_wallet", build_wallet)
+    monkeypatch.setattr(worker, "_take_trade_intents", lambda: ({b"1:hk_a": b"0.5"}, {b"1:hk_a": b"1"}))
+    monkeypatch.setattr(worker, "redis_client", MagicMock())
+
+    stats = await worker._flush_trades()
+
+    assert stats["extrinsics"] == 1
+    assert built_on and threading.current_thread() not in built_on
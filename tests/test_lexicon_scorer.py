@@ -0,0 +1,27 @@
+import numpy as np
+
+from app.sentiment import LexiconScorer
+
+
+def test_lexicon_scorer_scores_a_batch_in_one_pass():
+    scorer = LexiconScorer()
+    scores = scorer.score([
+        "Subnet 18 is bullish, great gains this week!",
+        "Looks like a scam, total rug",
+        "Emissions update for netuid 3",
+        "This is not good",
+        "",
+    ])
+
+    assert scores.shape == (5,)
+    assert scores[0] > 50 and scores[1] < -50
+    assert scores[2] == 0 and scores[4] == 0
+    assert scores[3] < 0  # negation flips "good"
+    assert np.all(np.abs(scores) <= 100)
+
+
+def test_negation_does_not_leak_into_the_next_tweet():
+    scorer = LexiconScorer({"good": 2.0})
+    together = scorer.score(["I said no", "good"])
+    assert together[1] == scorer.score(["good"])[0] > 0
+    assert scorer.score([]).shape == (0,)
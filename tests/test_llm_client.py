@@ -0,0 +1,57 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app import clients
+from app.clients import LLMClient, parse_batch_scores
+
+
+@pytest.mark.asyncio
+async def test_llm_client_reuses_one_keepalive_connection(monkeypatch):
+    client_ports = []
+
+    async def completions(request):
+        client_ports.append(request.transport.get_extra_info("peername")[1])
+        return web.json_response({"choices": [{"message": {"content": "42"}}]})
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", completions)
+    server = TestServer(app)
+    await server.start_server()
+    monkeypatch.setattr(clients, "CHUTES_API_URL", str(server.make_url("/v1/chat/completions")))
+
+    llm = LLMClient()
+    try:
+        assert [await llm.query_chute_llm("tweet") for _ in range(3)] == ["42"] * 3
+        assert len(set(client_ports)) == 1
+    finally:
+        await llm.close()
+        await server.close()
+    assert llm._session is None
+
+
+@pytest.mark.asyncio
+async def test_llm_session_is_not_replaced_from_another_loop():
+    llm = LLMClient()
+    session = llm._get_session()
+
+    async def open_session():
+        return llm._get_session()
+
+    # Replacing it would leak its connector, which only its own loop can close
+    with ThreadPoolExecutor(max_workers=1) as other_thread:
+        with pytest.raises(RuntimeError):
+            other_thread.submit(asyncio.run, open_session()).result()
+    assert llm._get_session() is session and not session.closed
+    await llm.close()
+
+
+def test_parse_batch_scores_keeps_only_requested_in_range_scores():
+    content = 'Scores: {"1": 42, "2": "-10.5", "3": 250, "4": "n/a", "9": 5}'
+    assert parse_batch_scores(content, [1, 2, 3, 4]) == {1: 42.0, 2: -10.5}
+
+    with pytest.raises(ValueError):
+        parse_batch_scores("I cannot score these tweets", [1])
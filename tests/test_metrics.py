@@ -0,0 +1,136 @@
+import json
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.config import REDIS_HOST, REDIS_PORT
+from app.main import app
+from app.metrics import TimedAsyncRedis, TimedRedis
+from app.routes import dividends
+from app.utils import fetch_subnet_dividends
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.mark.asyncio
+async def test_redis_clients_time_commands_and_pipelines():
+    before = (_sample("tao_redis_command_seconds_count", command="SET"),
+              _sample("tao_redis_command_seconds_count", command="PIPELINE"))
+
+    client = TimedRedis(host=REDIS_HOST, port=REDIS_PORT, db=15)
+    client.set("metrics:probe", 1)
+    pipe = client.pipeline(transaction=False)
+    pipe.get("metrics:probe")
+    pipe.delete("metrics:probe")
+    assert pipe.execute() == [b"1", 1]
+
+    async_client = TimedAsyncRedis(host=REDIS_HOST, port=REDIS_PORT, db=15)
+    await async_client.set("metrics:probe", 1)
+    pipe = async_client.pipeline(transaction=True)
+    pipe.get("metrics:probe")
+    pipe.delete("metrics:probe")
+    assert await pipe.execute() == [b"1", 1]
+    await async_client.aclose()
+
+    assert _sample("tao_redis_command_seconds_count", command="SET") == before[0] + 2
+    assert _sample("tao_redis_command_seconds_count", command="PIPELINE") == before[1] + 2
+
+
+@pytest.mark.asyncio
+async def test_get_dividend_counts_cache_hits_and_misses_per_condition(monkeypatch):
+    monkeypatch.setattr(dividends, "get_current_snapshot", AsyncMock(return_value={"block_hash": "0xabc"}))
+    monkeypatch.setattr(dividends, "read_dividend", AsyncMock(return_value=42))
+    monkeypatch.setattr(dividends, "read_subnet_dividends", AsyncMock(return_value={}))
+    monkeypatch.setattr(dividends, "_cached_sentiment", AsyncMock(return_value=None))
+    substrate = MagicMock()
+    substrate.query = AsyncMock(return_value=SimpleNamespace(value=7))
+    connection = MagicMock()
+    connection.__aenter__ = AsyncMock(return_value=substrate)
+    connection.__aexit__ = AsyncMock(return_value=False)
+    monkeypatch.setattr(dividends.substrate_pool, "connection", lambda: connection)
+    before = (_sample("tao_dividend_cache_requests_total", condition="1", result="hit"),
+              _sample("tao_dividend_cache_requests_total", condition="2", result="miss"),
+              _sample("tao_substrate_request_seconds_count", method="query", netuid="18"))
+
+    hit = await dividends.get_dividend(netuid=1, hotkey="hk", trade=False, current_user={})
+    miss = await dividends.get_dividend(netuid=1, hotkey=None, trade=False, current_user={})
+
+    assert hit["cached"] and not miss["cached"]
+    assert _sample("tao_dividend_cache_requests_total", condition="1", result="hit") == before[0] + 1
+    assert _sample("tao_dividend_cache_requests_total", condition="2", result="miss") == before[1] + 1
+    # The miss fell through to a chain query for the default subnet
+    assert _sample("tao_substrate_request_seconds_count", method="query", netuid="18") == before[2] + 1
+
+
+async def _query_map_result(rows):
+    async def records():
+        for row in rows:
+            yield row
+    return records()
+
+
+@pytest.mark.asyncio
+async def test_substrate_query_map_latency_is_recorded_per_netuid(mock_decode_account_id):
+    substrate = MagicMock()
+    substrate.query_map.side_effect = lambda *args, **kwargs: _query_map_result(
+        [(b"5GrwvaEF5zXb26Fz9rcQpDWS57CtERHpNehXCPcNoHGKutQY", SimpleNamespace(value=5))]
+    )
+    before = _sample("tao_substrate_request_seconds_count", method="query_map", netuid="4")
+
+    rows = await fetch_subnet_dividends(substrate, "0xabc", netuids=[4, 5])
+
+    assert rows == [(4, "test_hotkey", 5), (5, "test_hotkey", 5)]
+    assert _sample("tao_substrate_request_seconds_count", method="query_map", netuid="4") == before + 1
+
+
+def test_metrics_endpoint_exposes_prometheus_text():
+    response = TestClient(app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    for family in ("tao_redis_command_seconds", "tao_dividend_cache_requests_total", "tao_llm_request_seconds",
+                   "tao_datura_search_seconds", "tao_dividend_update_seconds", "tao_dividend_update_rows_written_total"):
+        assert f"# TYPE {family.removesuffix('_total')}" in response.text
+
+
+@pytest.mark.asyncio
+async def test_unknown_netuids_share_one_substrate_label(monkeypatch):
+    monkeypatch.setattr(dividends, "get_current_snapshot", AsyncMock(return_value=None))
+    monkeypatch.setattr(dividends, "_cached_sentiment", AsyncMock(return_value=None))
+    substrate = MagicMock()
+    substrate.query = AsyncMock(return_value=SimpleNamespace(value=7))
+    connection = MagicMock()
+    connection.__aenter__ = AsyncMock(return_value=substrate)
+    connection.__aexit__ = AsyncMock(return_value=False)
+    monkeypatch.setattr(dividends.substrate_pool, "connection", lambda: connection)
+    before = _sample("tao_substrate_request_seconds_count", method="query", netuid="other")
+
+    for netuid in (999, 123456):
+        await dividends.get_dividend(netuid=netuid, hotkey="hk", trade=False, current_user={})
+
+    assert _sample("tao_substrate_request_seconds_count", method="query", netuid="other") == before + 2
+    assert REGISTRY.get_sample_value("tao_substrate_request_seconds_count", {"method": "query", "netuid": "999"}) is None
+
+
+@pytest.mark.asyncio
+async def test_fresh_sentiment_read_is_one_redis_round_trip(monkeypatch):
+    client = TimedAsyncRedis(host=REDIS_HOST, port=REDIS_PORT, db=15)
+    monkeypatch.setattr(dividends, "async_redis_client", client)
+    await client.set(dividends.get_sentiment_cache_key(7), json.dumps({"sentiment_score": 5, "updated_at": time.time()}))
+    before = (_sample("tao_redis_command_seconds_count", command="PIPELINE"),
+              _sample("tao_redis_command_seconds_count", command="HINCRBY"),
+              _sample("tao_sentiment_fresh_reads_total"))
+
+    assert (await dividends._cached_sentiment(7))["sentiment_score"] == 5
+
+    assert _sample("tao_redis_command_seconds_count", command="PIPELINE") == before[0] + 1
+    assert _sample("tao_redis_command_seconds_count", command="HINCRBY") == before[1]
+    assert _sample("tao_sentiment_fresh_reads_total") == before[2] + 1
+    await client.flushdb()
+    await client.aclose()
@@ -405,7 +405,7 @@ async def test_sentiment_based_staking():
         try:
             
             # Create the task instance
-            result = await execute_sentiment_trade(hotkey=wallet_info['hotkey'], sentiment_score=sentiment_score)
+            result = execute_sentiment_trade(hotkey=wallet_info['hotkey'], sentiment_score=sentiment_score)
 
             # Validate if the action in result matches the expected action
             if result['action'] == case['expected_action']:
@@ -0,0 +1,155 @@
+import asyncio
+import json
+import time
+from unittest.mock import MagicMock
+
+import pytest
+import redis
+
+from app.config import (
+    REDIS_HOST, REDIS_PORT, SENTIMENT_STALE_AFTER, LEXICON_SCORE_TTL,
+    get_sentiment_cache_key, get_sentiment_lock_key, get_tweet_sentiment_key, get_sentiment_demand_key, get_sentiment_refresh_stats_key
+)
+from tasks import worker
+
+
+@pytest.fixture
+def sentiment_env(monkeypatch):
+    """Worker wired to a scratch Redis database with enqueueing mocked out."""
+    client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=15)
+    client.flushdb()
+    monkeypatch.setattr(worker, "redis_client", client)
+    delay = MagicMock()
+    monkeypatch.setattr(worker.analyze_sentiment, "delay", delay)
+    monkeypatch.setattr(worker.analyze_sentiment_batch, "delay", delay)
+    yield client, delay
+    client.flushdb()
+
+
+def test_at_most_one_refresh_in_flight_per_netuid(sentiment_env):
+    client, delay = sentiment_env
+
+    assert worker.request_sentiment_refresh(18)
+    assert not worker.request_sentiment_refresh(18)
+    assert worker.request_sentiment_refresh(19)
+    assert delay.call_count == 2
+    # The lock is held for as long as the analysis may run, retries included
+    attempts = worker.analyze_sentiment.max_retries + 1
+    assert client.ttl(get_sentiment_lock_key(18)) >= attempts * worker.TASK_TIMEOUT
+
+    # A finished analysis releases the lock and is served as fresh
+    worker._store_sentiment(18, {"success": True, "sentiment_score": "42"})
+    assert worker.is_sentiment_fresh(json.loads(client.get(get_sentiment_cache_key(18))))
+    assert worker.request_sentiment_refresh(18)
+
+    stats = client.hgetall(get_sentiment_refresh_stats_key())
+    assert int(stats[b"enqueued"]) == 3
+    assert int(stats[b"suppressed_in_flight"]) == 1
+
+
+def test_scheduled_sweep_refreshes_only_stale_requested_netuids(sentiment_env):
+    client, delay = sentiment_env
+    now = time.time()
+    client.zadd(get_sentiment_demand_key(), {1: now, 2: now, 3: now})
+    client.set(get_sentiment_cache_key(1), json.dumps({"sentiment_score": "10", "updated_at": now}))
+    client.set(get_sentiment_cache_key(2), json.dumps({"sentiment_score": "10", "updated_at": now - SENTIMENT_STALE_AFTER - 1}))
+
+    assert worker.refresh_stale_sentiments() == {"netuids": 3, "stale": 2, "enqueued": 2}
+    delay.assert_called_once_with(netuids=[2, 3])
+
+    # Both stale netuids are now in flight, so the next sweep enqueues nothing
+    assert worker.refresh_stale_sentiments() == {"netuids": 3, "stale": 2, "enqueued": 0}
+    assert delay.call_count == 1
+
+
+class FakeLLM:
+    def __init__(self, scores, batch_error=None, delay=0):
+        self.scores = scores
+        self.batch_error = batch_error
+        self.delay = delay
+        self.batches = []
+        self.singles = []
+
+    async def score_tweets(self, tweets):
+        self.batches.append(list(tweets))
+        await asyncio.sleep(self.delay)
+        if self.batch_error:
+            raise self.batch_error
+        # The model drops "skipped" from its answer
+        return {index: self.scores[tweet] for index, tweet in enumerate(tweets) if tweet != "skipped"}
+
+    async def query_chute_llm(self, tweet):
+        self.singles.append(tweet)
+        return str(self.scores[tweet])
+
+
+def _search_result(*texts):
+    return [{"id": text, "text": text} for text in texts]
+
+
+def test_tweets_are_keyed_by_id_or_content_hash():
+    tweets = worker._tweets([{"id": "123", "text": "up"}, {"text": "down"}, {"text": "down"}, {"id": "9"}])
+    assert list(tweets.values()) == ["up", "down"]
+    assert list(tweets)[0] == "id:123"
+
+
+@pytest.mark.asyncio
+async def test_only_unscored_tweets_go_to_the_llm(sentiment_env, monkeypatch):
+    client, _ = sentiment_env
+    llm = FakeLLM({"a": 10.0, "b": -20.0, "c": 30.0, "d": 40.0, "skipped": 5.0})
+    monkeypatch.setattr(worker, "get_llm_client", lambda: llm)
+    first = {1: worker._tweets(_search_result("a", "b")), 2: worker._tweets(_search_result("b", "c", "skipped"))}
+
+    assert await worker.score_sentiments(first, batch_size=2) == {1: (-5.0, "llm"), 2: (5.0, "llm")}
+    # "b" is shared by both subnets and scored once; "skipped" fell back to its own request
+    assert sorted(sorted(batch) for batch in llm.batches) == [["a", "b"], ["c", "skipped"]]
+    assert llm.singles == ["skipped"]
+
+    # The same tweets again cost no LLM calls and give the same aggregate
+    llm.batches.clear()
+    llm.singles.clear()
+    assert await worker.score_sentiments(first, batch_size=2) == {1: (-5.0, "llm"), 2: (5.0, "llm")}
+    assert llm.batches == [] and llm.singles == []
+
+    # A new tweet is the only one scored; the subnet score is the mean over all its tweets
+    second = {1: worker._tweets(_search_result("a", "b", "d"))}
+    assert await worker.score_sentiments(second, batch_size=2) == {1: (10.0, "llm")}
+    assert llm.singles == ["d"]
+
+    stats = client.hgetall(get_sentiment_refresh_stats_key())
+    assert (int(stats[b"tweets_scored_llm"]), int(stats[b"tweets_cached"])) == (5, 6)
+
+
+@pytest.mark.asyncio
+async def test_score_sentiments_falls_back_per_tweet_on_invalid_batch(sentiment_env, monkeypatch):
+    llm = FakeLLM({"a": 7.0, "b": 9.0}, batch_error=ValueError("no JSON object"))
+    monkeypatch.setattr(worker, "get_llm_client", lambda: llm)
+
+    scores = await worker.score_sentiments({1: worker._tweets(_search_result("a", "b"))}, batch_size=10)
+
+    assert scores == {1: (8.0, "llm")}
+    assert sorted(llm.singles) == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_slow_llm_falls_back_to_lexicon_scores_within_the_deadline(sentiment_env, monkeypatch):
+    client, _ = sentiment_env
+    llm = FakeLLM({"great gains": 90.0, "scam": -90.0}, delay=5)
+    monkeypatch.setattr(worker, "get_llm_client", lambda: llm)
+    tweets = {1: worker._tweets(_search_result("great gains", "scam"))}
+
+    start = time.perf_counter()
+    scores = await worker.score_sentiments(tweets, batch_size=10, deadline=0.05)
+
+    assert time.perf_counter() - start < 1
+    expected = float(worker.get_lexicon_scorer().score(["great gains", "scam"]).mean())
+    assert scores[1] == (pytest.approx(expected), "lexicon")
+    # Lexicon scores expire early, so the next refresh asks the LLM again
+    assert 0 < client.ttl(get_tweet_sentiment_key("id:scam")) <= LEXICON_SCORE_TTL
+
+    # Once the LLM answers in time, its score replaces the expired lexicon one
+    client.delete(get_tweet_sentiment_key("id:scam"))
+    llm.delay = 0
+    great_gains = float(worker.get_lexicon_scorer().score(["great gains"])[0])
+    scores = await worker.score_sentiments(tweets, batch_size=10, deadline=1)
+    assert scores[1] == (pytest.approx((great_gains - 90.0) / 2), "mixed")
@@ -0,0 +1,37 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Generous enough for a cold CI runner; wallet/subtensor code alone costs more than this
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", 3.0))
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "elapsed": elapsed,
+    "loaded": [name for name in ("bittensor", "app.wallet", "datura_py") if name in sys.modules],
+}))
+"""
+
+
+def test_api_import_is_fast_and_skips_wallet_code():
+    # Unreachable Redis: importing the API must not need the network
+    env = dict(os.environ, REDIS_HOST="127.0.0.1", REDIS_PORT="1")
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=Path(__file__).resolve().parents[1],
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+
+    assert probe["loaded"] == []
+    assert probe["elapsed"] < IMPORT_BUDGET_SECONDS
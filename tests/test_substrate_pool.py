@@ -0,0 +1,23 @@
+import pytest
+from unittest.mock import patch, AsyncMock
+
+from app.clients import SubstratePool
+
+
+@pytest.mark.asyncio
+async def test_substrate_pool_reconnects_unhealthy_connection():
+    """A connection that fails its health check is replaced before reuse."""
+    with patch('app.clients.AsyncSubstrateInterface') as mock_substrate:
+        broken, fresh = AsyncMock(), AsyncMock()
+        broken.get_chain_head.side_effect = Exception("connection reset")
+        mock_substrate.side_effect = [broken, fresh]
+
+        pool = SubstratePool(url="ws://test", size=1, health_check_interval=0)
+        await pool.start()
+
+        async with pool.connection() as substrate:
+            assert substrate is fresh
+
+        broken.close.assert_awaited_once()
+        await pool.close()
+        fresh.close.assert_awaited_once()
@@ -0,0 +1,65 @@
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+import redis
+
+from app.config import REDIS_HOST, REDIS_PORT, get_trade_flush_stats_key, get_trade_intents_key
+from tasks import worker
+
+
+@pytest.fixture
+def trade_env(monkeypatch):
+    """Worker wired to a scratch Redis database and a mocked wallet."""
+    client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=15)
+    client.flushdb()
+    monkeypatch.setattr(worker, "redis_client", client)
+    wallet = MagicMock()
+    wallet.add_stake_multiple = AsyncMock(return_value={"success": True, "extrinsics": 1})
+    wallet.unstake_multiple = AsyncMock(return_value={"success": True, "extrinsics": 1})
+    monkeypatch.setattr(worker, "get_wallet", lambda: wallet)
+    yield client, wallet
+    client.flushdb()
+
+
+@pytest.mark.asyncio
+async def test_trade_intents_are_netted_per_subnet_and_hotkey(trade_env):
+    client, wallet = trade_env
+    for netuid, hotkey, score in [(1, "hk_a", 50), (1, "hk_a", -20), (1, "hk_a", 10),
+                                  (2, "hk_b", -30), (3, "hk_c", 40), (3, "hk_c", -40)]:
+        result = worker.execute_sentiment_trade(netuid=netuid, hotkey=hotkey, sentiment_score=score)
+        assert result["success"]
+
+    stats = await worker._flush_trades()
+
+    wallet.add_stake_multiple.assert_awaited_once_with([(1, "hk_a", 0.4)])
+    wallet.unstake_multiple.assert_awaited_once_with([(2, "hk_b", 0.3)])
+    assert stats["intents"] == 6
+    assert stats["netted"] == 4
+    assert stats["extrinsics"] == 2
+    assert json.loads(client.get(get_trade_flush_stats_key())) == stats
+    assert not client.exists(get_trade_intents_key())
+
+
+@pytest.mark.asyncio
+async def test_failed_trade_batch_is_requeued(trade_env):
+    client, wallet = trade_env
+    wallet.add_stake_multiple.return_value = {"success": False, "error": "boom", "extrinsics": 1, "uncertain": False}
+    worker.execute_sentiment_trade(netuid=1, hotkey="hk_a", sentiment_score=50)
+
+    stats = await worker._flush_trades()
+
+    assert stats["failed"] == 1
+    assert float(client.hget(get_trade_intents_key(), "1:hk_a")) == pytest.approx(0.5)
+
+
+@pytest.mark.asyncio
+async def test_unconfirmed_trade_batch_is_not_resubmitted(trade_env):
+    client, wallet = trade_env
+    wallet.add_stake_multiple.return_value = {"success": False, "error": "timeout", "extrinsics": 1, "uncertain": True}
+    worker.execute_sentiment_trade(netuid=1, hotkey="hk_a", sentiment_score=50)
+
+    stats = await worker._flush_trades()
+
+    assert (stats["uncertain"], stats["failed"], stats["extrinsics"]) == (1, 0, 1)
+    assert not client.exists(get_trade_intents_key())
@@ -1,8 +1,13 @@
 import os
 import pytest
 import asyncio
+from types import SimpleNamespace
 from pathlib import Path
-from app.clients import BittensorWallet
+from unittest.mock import AsyncMock, patch
+from bittensor.utils.balance import Balance
+from prometheus_client import REGISTRY
+from app import wallet as wallet_module
+from app.wallet import BittensorWallet, load_wallet, _keypair_from_mnemonic
 
 # Test configuration
 TEST_MNEMONIC = "diamond like interest affair safe clarify lawsuit innocent beef van grief color"
@@ -12,6 +17,10 @@ TEST_BALANCE = 100.0
 TEST_DIVIDENDS = 10.0
 TEST_TRANSFER_AMOUNT = 0.1
 
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
 @pytest.fixture(scope="function")
 def bittensor_wallet(mock_bittensor_wallet, mock_async_subtensor):
     """Create a test Bittensor wallet."""
@@ -21,7 +30,7 @@ def bittensor_wallet(mock_bittensor_wallet, mock_async_subtensor):
 async def test_bittensor_wallet_operations(bittensor_wallet):
     """Test Bittensor wallet operations."""
     # Test getting wallet info
-    info = bittensor_wallet.get_wallet_info()
+    info = await bittensor_wallet.get_wallet_info()
     assert info is not None
     assert isinstance(info["tao_balance"], float), f"Expected float, got {type(info['tao_balance'])}"
     
@@ -35,4 +44,151 @@ async def test_bittensor_wallet_operations(bittensor_wallet):
     # Test getting balance
     balance = await bittensor_wallet.get_tao_balance()
     assert isinstance(balance, float), f"Expected float, got {type(balance)}"
-    assert balance >= 40.0
\ No newline at end of file
+    assert balance >= 40.0
+
+def test_load_wallet_reuses_matching_keys(tmp_path):
+    other_mnemonic = "legal winner thank year wave sausage worth useful legal winner thank yellow"
+    _keypair_from_mnemonic.cache_clear()
+
+    first = load_wallet("test_wallet", "test_hotkey", str(tmp_path), TEST_MNEMONIC)
+    coldkey_path = Path(first.coldkey_file.path)
+    written = coldkey_path.stat().st_mtime_ns
+    os.utime(coldkey_path, ns=(written - 10**9, written - 10**9))
+
+    # Key files already match the mnemonic: nothing is derived or written again
+    second = load_wallet("test_wallet", "test_hotkey", str(tmp_path), TEST_MNEMONIC)
+    assert coldkey_path.stat().st_mtime_ns == written - 10**9
+    assert _keypair_from_mnemonic.cache_info().misses == 1
+    assert second.coldkeypub.ss58_address == first.coldkeypub.ss58_address
+
+    # Keys from another mnemonic are replaced
+    replaced = load_wallet("test_wallet", "test_hotkey", str(tmp_path), other_mnemonic)
+    assert coldkey_path.stat().st_mtime_ns != written - 10**9
+    assert replaced.coldkeypub.ss58_address == _keypair_from_mnemonic(other_mnemonic).ss58_address
+
+
+@pytest.mark.asyncio
+async def test_wallet_shares_one_async_subtensor_connection(tmp_path, monkeypatch):
+    monkeypatch.setattr(wallet_module, "BITTENSOR_MNEMONIC", TEST_MNEMONIC)
+    with patch.object(wallet_module.bt, "AsyncSubtensor") as async_subtensor:
+        subtensor = AsyncMock()
+        subtensor.get_balance.return_value = Balance.from_tao(TEST_BALANCE)
+        async_subtensor.return_value = subtensor
+
+        wallet = BittensorWallet(str(tmp_path))
+        subtensor.initialize.assert_not_called()
+
+        async with wallet:
+            balances = await asyncio.gather(*(wallet.get_tao_balance() for _ in range(5)))
+
+        assert balances == [TEST_BALANCE] * 5
+        subtensor.initialize.assert_awaited_once()
+        subtensor.close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_wallet_balance_cached_for_ttl(tmp_path, monkeypatch):
+    monkeypatch.setattr(wallet_module, "BITTENSOR_MNEMONIC", TEST_MNEMONIC)
+    now = [1000.0]
+    monkeypatch.setattr(wallet_module.time, "monotonic", lambda: now[0])
+    with patch.object(wallet_module.bt, "AsyncSubtensor") as async_subtensor:
+        subtensor = AsyncMock()
+        subtensor.get_balance.return_value = Balance.from_tao(TEST_BALANCE)
+        subtensor.add_stake.return_value = True
+        async_subtensor.return_value = subtensor
+        wallet = BittensorWallet(str(tmp_path))
+
+        before = (_sample("tao_wallet_balance_lookups_total", result="hit"),
+                  _sample("tao_wallet_balance_lookups_total", result="miss"))
+        assert await wallet.get_tao_balance() == TEST_BALANCE
+        assert await wallet.get_tao_balance() == TEST_BALANCE
+        assert subtensor.get_balance.await_count == 1
+        subtensor.get_balance.assert_awaited_with(wallet.wallet.coldkeypub.ss58_address)
+        assert _sample("tao_wallet_balance_lookups_total", result="hit") == before[0] + 1
+        assert _sample("tao_wallet_balance_lookups_total", result="miss") == before[1] + 1
+
+        # Our own stake is applied to the cached balance without a chain read
+        result = await wallet.add_stake(netuid=1, hotkey=TEST_HOTKEY_ADDRESS, amount=TEST_TRANSFER_AMOUNT)
+        assert result["success"]
+        assert (await wallet.get_wallet_info())["tao_balance"] == pytest.approx(TEST_BALANCE - TEST_TRANSFER_AMOUNT)
+        assert subtensor.get_balance.await_count == 1
+
+        # Expired entries are re-read; no block number is fetched or guessed
+        now[0] += wallet_module.BALANCE_CACHE_TTL
+        assert await wallet.get_tao_balance() == TEST_BALANCE
+        assert subtensor.get_balance.await_count == 2
+        subtensor.get_current_block.assert_not_awaited()
+
+
+class _ExtrinsicResponse:
+    """Like the substrate receipt, whose outcome fields are awaitable properties."""
+
+    def __init__(self, success, error=None):
+        self.success, self.error = success, error
+
+    @property
+    async def is_success(self):
+        return self.success
+
+    @property
+    async def error_message(self):
+        return self.error
+
+
+@pytest.mark.asyncio
+async def test_stake_multiple_submits_one_atomic_batch(tmp_path, monkeypatch):
+    monkeypatch.setattr(wallet_module, "BITTENSOR_MNEMONIC", TEST_MNEMONIC)
+    with patch.object(wallet_module.bt, "AsyncSubtensor") as async_subtensor:
+        subtensor = AsyncMock()
+        subtensor.get_balance.return_value = Balance.from_tao(TEST_BALANCE)
+        subtensor.subnet.return_value = SimpleNamespace(price=Balance.from_tao(2.0))
+        subtensor.substrate.compose_call.side_effect = lambda **kwargs: kwargs
+        subtensor.substrate.create_signed_extrinsic.side_effect = lambda **kwargs: kwargs
+        subtensor.substrate.submit_extrinsic.side_effect = lambda *args, **kwargs: _ExtrinsicResponse(True)
+        async_subtensor.return_value = subtensor
+        wallet = BittensorWallet(str(tmp_path))
+        assert await wallet.get_tao_balance() == TEST_BALANCE
+        subtensor.get_balance.return_value = Balance.from_tao(TEST_BALANCE - 0.7)
+
+        result = await wallet.add_stake_multiple([(1, "hk_a", 0.5), (2, "hk_b", 0.25)])
+
+        assert result == {"success": True, "error": None, "extrinsics": 1, "uncertain": False}
+        subtensor.substrate.submit_extrinsic.assert_awaited_once()
+        batch = subtensor.substrate.submit_extrinsic.await_args.args[0]["call"]
+        assert (batch["call_module"], batch["call_function"]) == ("Utility", "batch_all")
+        assert [(call["call_function"], call["call_params"]["netuid"], call["call_params"]["amount_staked"])
+                for call in batch["call_params"]["calls"]] == [("add_stake_limit", 1, 500_000_000), ("add_stake_limit", 2, 250_000_000)]
+        # Price protected like a single safe stake: 0.5% over the subnet price, partial fills allowed
+        assert all(call["call_params"]["limit_price"] == 2_010_000_000 and call["call_params"]["allow_partial"]
+                   for call in batch["call_params"]["calls"])
+        # A partial fill may have staked less than requested, so the balance is re-read
+        assert await wallet.get_tao_balance() == pytest.approx(TEST_BALANCE - 0.7)
+
+        # A rejected batch applied nothing and is reported as a definite failure
+        subtensor.substrate.submit_extrinsic.side_effect = lambda *args, **kwargs: _ExtrinsicResponse(
+            False, {"type": "Module", "name": "NotEnoughStakeToWithdraw", "docs": []})
+        result = await wallet.unstake_multiple([(1, "hk_a", 0.5)])
+        assert (result["success"], result["uncertain"]) == (False, False)
+
+
+@pytest.mark.asyncio
+async def test_batch_is_uncertain_only_once_sent(tmp_path, monkeypatch):
+    monkeypatch.setattr(wallet_module, "BITTENSOR_MNEMONIC", TEST_MNEMONIC)
+    with patch.object(wallet_module.bt, "AsyncSubtensor") as async_subtensor:
+        subtensor = AsyncMock()
+        subtensor.get_balance.return_value = Balance.from_tao(TEST_BALANCE)
+        subtensor.subnet.return_value = SimpleNamespace(price=Balance.from_tao(2.0))
+        async_subtensor.return_value = subtensor
+        wallet = BittensorWallet(str(tmp_path))
+
+        # Signing failed: nothing reached the chain, so the trades can be requeued
+        subtensor.substrate.create_signed_extrinsic.side_effect = RuntimeError("nonce lookup failed")
+        result = await wallet.add_stake_multiple([(1, "hk_a", 0.5)])
+        assert (result["success"], result["uncertain"], result["extrinsics"]) == (False, False, 0)
+        subtensor.substrate.submit_extrinsic.assert_not_awaited()
+
+        # The connection dropped after sending: the batch may still be included
+        subtensor.substrate.create_signed_extrinsic.side_effect = None
+        subtensor.substrate.submit_extrinsic.side_effect = ConnectionError("websocket closed")
+        result = await wallet.add_stake_multiple([(1, "hk_a", 0.5)])
+        assert (result["success"], result["uncertain"], result["extrinsics"]) == (False, True, 1)